@@ -0,0 +1,6 @@
+"""
+  Benchmarks of the Package sheaves_on_posets.
+
+  Run them from the root of the repository with ``sage -python -m benchmarks.run``,
+  see :mod:`benchmarks.run`.
+"""
@@ -0,0 +1,113 @@
+"""
+  Scalable Families of Posets and Sheaves for the Benchmarks.
+"""
+
+# imports
+import itertools
+import random
+
+from sage.combinat.posets.posets import Poset
+from sage.combinat.posets.poset_examples import posets
+from sage.matrix.special import identity_matrix
+from sage.matrix.constructor import matrix
+from sage.rings.integer_ring import ZZ
+
+#-------------------------------------------------------------------------------
+def face_poset(facets):
+    """
+      Return the face poset of the simplicial complex with the facets ``facets``, whose
+      points are the nonempty faces as sorted tuples of vertices.
+    """
+    faces = set()
+    for facet in facets:
+        for k in range(1, len(facet) + 1):
+            faces.update(itertools.combinations(sorted(facet), k))
+    faces = sorted(faces)
+    covers = [(face, coface) for coface in faces if len(coface) > 1 for face in itertools.combinations(coface, len(coface) - 1)]
+    return Poset((faces, covers), cover_relations=True)
+
+def sphere(n):
+    """
+      Return the face poset of the boundary of the ``n``-simplex, a simplicial ``(n-1)``-sphere.
+    """
+    return face_poset(itertools.combinations(range(n + 1), n))
+
+def torus(n):
+    """
+      Return the face poset of the triangulation of the torus with ``n**2`` vertices,
+      obtained from the ``n`` by ``n`` grid with opposite sides identified. ``n`` must be
+      at least ``3``.
+    """
+    vertex = lambda i, j: (i % n)*n + (j % n)
+    facets = []
+    for i in range(n):
+        for j in range(n):
+            facets.append((vertex(i, j), vertex(i + 1, j), vertex(i + 1, j + 1)))
+            facets.append((vertex(i, j), vertex(i, j + 1), vertex(i + 1, j + 1)))
+    return face_poset(facets)
+
+def boolean(n):
+    """
+      Return the Boolean lattice of the subsets of an ``n``-element set.
+    """
+    return posets.BooleanLattice(n)
+
+def chain(n):
+    """
+      Return the chain with ``n`` points.
+    """
+    return posets.ChainPoset(n)
+
+def random_graded(n, width=4, seed=0):
+    """
+      Return a random graded poset with ``n`` levels of ``width`` points, in which every
+      point covers a random nonempty set of points of the level below. The poset only
+      depends on ``n``, ``width`` and ``seed``.
+    """
+    rng = random.Random(seed)
+    points = [(level, k) for level in range(n) for k in range(width)]
+    covers = []
+    for level in range(1, n):
+        for k in range(width):
+            below = rng.sample(range(width), rng.randint(1, width))
+            covers.extend(((level - 1, l), (level, k)) for l in below)
+    return Poset((points, covers), cover_relations=True)
+
+FAMILIES = {"sphere":sphere, "torus":torus, "boolean":boolean, "chain":chain, "random_graded":random_graded}
+
+def _unimodular(n, rng):
+    """
+      Return a random invertible ``n`` by ``n`` matrix over ``ZZ``.
+    """
+    mat = identity_matrix(ZZ, n)
+    for step in range(3*n):
+        i, j = rng.randrange(n), rng.randrange(n)
+        if i != j:
+            mat.add_multiple_of_row(i, j, rng.choice([-1, 1, 2]))
+    return mat
+
+def random_sheaf_data(poset, base_ring=ZZ, rank=3, seed=0):
+    """
+      Return the dictionaries ``(stalk_dict, res_dict)`` of a random locally free sheaf of
+      rank at most ``rank`` on ``poset``.
+
+      Every point gets a set of basis vectors of the free module of rank ``rank`` that
+      contains the sets of its upper covers, the restriction maps are the projections,
+      and a random change of basis is applied to every stalk, so the restriction maps are
+      functorial but not sparse. The data only depends on the arguments.
+    """
+    rng = random.Random(seed)
+    supports = dict()
+    for x in reversed(poset.linear_extension()):
+        support = set()
+        for y in poset.upper_covers(x):
+            support.update(supports[y])
+        support.update(k for k in range(rank) if rng.random() < 0.5)
+        supports[x] = sorted(support)
+    bases = {x:_unimodular(len(supports[x]), rng) for x in poset}
+    stalk_dict = {x:len(supports[x]) for x in poset}
+    res_dict = dict()
+    for a, b in poset.cover_relations():
+        projection = matrix(ZZ, len(supports[b]), len(supports[a]), {(row, supports[a].index(k)):1 for row, k in enumerate(supports[b])})
+        res_dict[(a, b)] = matrix(base_ring, bases[b]*projection*bases[a].inverse().change_ring(ZZ))
+    return stalk_dict, res_dict
@@ -0,0 +1,209 @@
+"""
+  Running the Benchmarks and Comparing Them with a Baseline.
+
+  From the root of the repository::
+
+      sage -python -m benchmarks.run --output results.json
+      sage -python -m benchmarks.run --save-baseline benchmarks/baseline.json
+      sage -python -m benchmarks.run --baseline benchmarks/baseline.json --time-tolerance 0.5
+
+  Every case is a sheaf of the families in :mod:`benchmarks.families`, given by its family
+  and size, on which all benchmarks in :data:`BENCHMARKS` are run. The time of a benchmark
+  is the minimum over ``--repeat`` runs on fresh objects; the peak memory is measured with
+  ``tracemalloc`` in a separate run, so it covers the memory allocated through Python, not
+  the memory of matrices allocated by the libraries of Sage. The sizes of the posets,
+  sheaves and complexes are recorded too; they must be the same as in the baseline.
+
+  The exit status is ``1`` if a benchmark is slower, or uses more memory, than in the
+  baseline by more than the tolerance, or if a size differs.
+"""
+
+# imports
+try:
+    import sage.all
+except ImportError:
+    # modular distributions of Sage
+    import sage.all__sagemath_combinat
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from sage.categories.homset import Hom
+
+from sheaves_on_posets import LocFreeSheaf, dualizing_complex, chain_index
+from .families import FAMILIES, random_sheaf_data
+
+#-------------------------------------------------------------------------------
+PRESETS = {
+    "quick":[("sphere", 3), ("torus", 3), ("boolean", 3), ("chain", 4), ("random_graded", 3)],
+    "default":[("sphere", 3), ("sphere", 4), ("torus", 3), ("torus", 4), ("boolean", 3), ("boolean", 4),
+               ("chain", 4), ("chain", 8), ("random_graded", 3), ("random_graded", 4)],
+    "large":[("sphere", 5), ("torus", 5), ("torus", 6), ("boolean", 5), ("chain", 12), ("random_graded", 5)],
+}
+
+# Differences in time below this number of seconds are never regressions.
+MIN_TIME_DIFFERENCE = 0.005
+
+class Case(object):
+    """
+      The data of a benchmark case: a poset of a family and the dictionaries of a random
+      sheaf on it, see :func:`random_sheaf_data`.
+    """
+    def __init__(self, family, size, rank):
+        """
+          Constructor of :class:`Case`
+        """
+        self.family = family
+        self.size = size
+        self.name = "{}-{}".format(family, size)
+        self.poset = FAMILIES[family](size)
+        self.stalk_dict, self.res_dict = random_sheaf_data(self.poset, rank=rank)
+        # the chain index is cached per poset and shared by all benchmarks
+        chain_index(self.poset)
+
+    def sheaf(self, check=False):
+        return LocFreeSheaf(self.stalk_dict, self.res_dict, domain_poset=self.poset, check=check)
+
+def _restrictions(F):
+    poset = F.domain_poset()
+    for x in poset.minimal_elements():
+        for y in poset.principal_order_filter(x):
+            if y != x:
+                F.restriction(x, y)
+
+def _morphism_setup(case):
+    F = case.sheaf()
+    epsilon, G0 = F.godement_sheaf()
+    components = {x:epsilon.component_matrix(x) for x in case.poset}
+    return lambda: Hom(F, G0)(components)
+
+# Every benchmark is a pair of a setup function, which returns the function to be timed
+# given a case, and a function that returns the sizes of the result.
+BENCHMARKS = {
+    "validation":(lambda case: lambda: case.sheaf(check=True), None),
+    "restriction":(lambda case: lambda: _restrictions(case.sheaf()), None),
+    "godement_cochain_complex":(lambda case: lambda: case.sheaf().godement_cochain_complex(),
+                                lambda C: {"ranks":[C.free_module_rank(d) for d in sorted(C.nonzero_degrees())]}),
+    "cohomology":(lambda case: lambda: case.sheaf().cohomology(),
+                  lambda H: {"cohomology":{str(d):str(group) for d, group in H.items()}}),
+    "godement_sheaf":(lambda case: lambda: case.sheaf().godement_sheaf(),
+                      lambda result: {"total_rank":sum(result[1]._compact.ranks())}),
+    "dualizing_complex":(lambda case: lambda: dualizing_complex(case.poset),
+                         lambda D: {"total_ranks":[sum(D.sheaf_at(p)._compact.ranks()) for p in range(D.below_bound(), D.above_bound() + 1)]}),
+    "morphism_check":(_morphism_setup, None),
+}
+
+def run_benchmark(case, name, repeat):
+    """
+      Run the benchmark ``name`` on ``case`` and return the dictionary of its results.
+    """
+    setup, sizes = BENCHMARKS[name]
+    times = []
+    for k in range(repeat):
+        function = setup(case)
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    function = setup(case)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    record = {"time":min(times), "times":times, "peak_memory":peak}
+    if sizes is not None:
+        record["sizes"] = sizes(result)
+    return record
+
+def run(cases, benchmarks, repeat, rank, log=None):
+    """
+      Run ``benchmarks`` on the cases ``cases``, pairs of a family and a size, and return
+      the dictionary of the results.
+    """
+    results = {"meta":{"python":platform.python_version(), "machine":platform.machine(), "repeat":repeat, "rank":rank}, "cases":dict()}
+    for family, size in cases:
+        case = Case(family, size, rank)
+        record = {"points":len(case.poset), "covers":len(case.res_dict),
+                  "total_stalk_rank":sum(case.stalk_dict.values()), "benchmarks":dict()}
+        for name in benchmarks:
+            record["benchmarks"][name] = run_benchmark(case, name, repeat)
+            if log is not None:
+                log("{:<20} {:<26} {:>10.4f} s {:>12} B".format(case.name, name, record["benchmarks"][name]["time"], record["benchmarks"][name]["peak_memory"]))
+        results["cases"][case.name] = record
+    return results
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """
+      Return the list of messages for the regressions of ``results`` with respect to
+      ``baseline``. A time or peak memory is a regression if it exceeds the baseline by more
+      than the relative tolerance; cases and benchmarks that are not in both are skipped.
+    """
+    messages = []
+    for case_name, record in results["cases"].items():
+        base_record = baseline["cases"].get(case_name)
+        if base_record is None:
+            continue
+        for key in ("points", "covers", "total_stalk_rank"):
+            if record[key] != base_record[key]:
+                messages.append("{}: {} is {}, baseline {}".format(case_name, key, record[key], base_record[key]))
+        for name, bench in record["benchmarks"].items():
+            base = base_record["benchmarks"].get(name)
+            if base is None:
+                continue
+            label = "{} {}".format(case_name, name)
+            if bench["time"] > base["time"]*(1 + time_tolerance) and bench["time"] - base["time"] > MIN_TIME_DIFFERENCE:
+                messages.append("{}: time {:.4f} s, baseline {:.4f} s".format(label, bench["time"], base["time"]))
+            if bench["peak_memory"] > base["peak_memory"]*(1 + memory_tolerance):
+                messages.append("{}: peak memory {} B, baseline {} B".format(label, bench["peak_memory"], base["peak_memory"]))
+            if bench.get("sizes") != base.get("sizes"):
+                messages.append("{}: sizes {}, baseline {}".format(label, bench.get("sizes"), base.get("sizes")))
+    return messages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of sheaves_on_posets")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="default", help="the set of cases")
+    parser.add_argument("--case", action="append", default=[], metavar="FAMILY:SIZE", help="run this case instead of a preset, can be repeated")
+    parser.add_argument("--benchmark", action="append", choices=sorted(BENCHMARKS), help="run only this benchmark, can be repeated")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs")
+    parser.add_argument("--rank", type=int, default=3, help="maximal stalk rank of the sheaves")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--save-baseline", metavar="FILE", help="write the results to this JSON file as the new baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare the results with this JSON file")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="allowed relative increase of times")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="allowed relative increase of peak memory")
+    args = parser.parse_args(argv)
+
+    if args.case:
+        cases = []
+        for spec in args.case:
+            family, size = spec.split(":")
+            if family not in FAMILIES:
+                parser.error("unknown family {}".format(family))
+            cases.append((family, int(size)))
+    else:
+        cases = PRESETS[args.preset]
+    benchmarks = args.benchmark or list(BENCHMARKS)
+
+    results = run(cases, benchmarks, args.repeat, args.rank, log=print)
+    for filename in (args.output, args.save_baseline):
+        if filename is not None:
+            with open(filename, "w") as result_file:
+                json.dump(results, result_file, indent=1, sort_keys=True)
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        messages = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+        for message in messages:
+            print("REGRESSION " + message)
+        if messages:
+            return 1
+        print("No regressions with respect to {}".format(args.baseline))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,7 @@ setuptools.setup(
     url="https://github.com/KoenBaak/sheaves_on_posets",
     packages=["sheaves_on_posets"],
     install_requires=["sagemath"],
+    python_requires=">=3.7",
     license='GPLv3+',
     classifiers=[
         "Topic :: Scientific/Engineering :: Mathematics",
@@ -1,2 +1,11 @@
-from .sheaf import LocFreeSheaf, LocallyFreeSheafFinitePoset, ConstantSheaf, ZeroSheaf
+from .sheaf import LocFreeSheaf, LocallyFreeSheafFinitePoset, ConstantSheaf, ZeroSheaf, direct_sum
 from .sheaf_complex import LocFreeSheafComplex, dualizing_complex
+from .chain_index import ChainIndex, chain_index
+from .morse import morse_reduction
+from .cellular import incidence_signs
+from .batch import cohomology_batch
+from .cache import PersistentCache, set_persistent_cache
+from .serialize import SheafWriter, save_sheaves, load_sheaves, iter_sheaves
+from .instrument import ProfileReport, profiling
+from .session import SheafSession
+from .numeric import numeric_rank
@@ -0,0 +1,137 @@
+"""
+  Cohomology of Many Sheaves on a Common Poset.
+"""
+
+# imports
+from sage.matrix.constructor import matrix
+from sage.homology.chain_complex import ChainComplex
+
+from .chain_index import chain_index
+from .morse import morse_reduction
+from .ranks import betti_numbers
+from .sheaf import _godement_differential_rows
+from .instrument import profile_phase
+
+#-------------------------------------------------------------------------------
+class _GodementPattern(object):
+    """
+      The sparsity pattern of the Godement differentials of all sheaves on a poset
+      with the same stalk ranks.
+
+      The identity blocks of the differentials only depend on the stalk ranks, so
+      they are computed once. For the restriction blocks, only their positions and
+      signs are stored, together with the pair of point numbers of the restriction map.
+
+      INPUT:
+
+      - ``sheaf`` -- a sheaf with the stalk ranks of the pattern.
+
+      - ``degrees`` -- the degrees ``p`` of the differentials from ``p`` to ``p+1``.
+    """
+    def __init__(self, sheaf, degrees):
+        """
+          Constructor of :class:`_GodementPattern`
+        """
+        self._base_ring = sheaf._base_ring
+        self._degrees = degrees
+        self._shapes = dict()
+        self._identity_entries = dict()
+        self._slots = dict()
+        for p in degrees:
+            identity_entries = dict()
+            slots = []
+            for task in sheaf._godement_differential_tasks(p):
+                chains, faces, row_offsets, col_offsets, restrictions = task[1:]
+                # with zero restrictions, only the identity blocks remain
+                zeros = {pair:matrix(self._base_ring, mat.nrows(), mat.ncols(), sparse=True) for pair, mat in restrictions.items()}
+                identity_entries.update(_godement_differential_rows((p, chains, faces, row_offsets, col_offsets, zeros)))
+                for k in range(len(row_offsets) - 1):
+                    pair = (chains[k*(p+2) + p], chains[k*(p+2) + p + 1])
+                    slots.append((row_offsets[k], col_offsets[faces[k*(p+2) + p + 1]], pair))
+                self._shapes[p] = (row_offsets[-1], col_offsets[-1])
+            self._identity_entries[p] = identity_entries
+            self._slots[p] = (1 if (p + 1) % 2 == 0 else -1, slots)
+
+    def cochain_complex(self, sheaf):
+        """
+          Return the (part of the) Godement cochain complex of ``sheaf``, which must
+          have the stalk ranks of ``self``.
+        """
+        compact = sheaf._compact
+        diff_dict = dict()
+        for p in self._degrees:
+            with profile_phase("differential", p):
+                entries = dict(self._identity_entries[p])
+                sign, slots = self._slots[p]
+                for row, col, pair in slots:
+                    for (a, b), value in compact.restriction(*pair).dict().items():
+                        entries[(row + a, col + b)] = sign*value
+                nrows, ncols = self._shapes[p]
+                diff_dict[p] = matrix(self._base_ring, nrows, ncols, entries, sparse=True)
+        return ChainComplex(diff_dict, base_ring=self._base_ring)
+
+def cohomology_batch(sheaves, degree=None, reduced=False, ranks_only=False, primes=None):
+    """
+      Compute the cohomology of many sheaves on the same poset over the same ring.
+
+      The chain index of the poset and the sparsity pattern of the Godement differentials
+      are computed once, and for every sheaf only its restriction blocks are filled in.
+      Sheaves with the same stalk ranks as the previous one reuse its pattern, which is
+      the case for example when only the restriction matrices vary.
+
+      INPUT:
+
+      - ``sheaves`` -- an iterable of instances of :class:`LocallyFreeSheafFinitePoset`,
+          all on the same domain poset and over the same base ring.
+
+      - ``degree``, ``reduced``, ``ranks_only``, ``primes`` -- as for
+          :meth:`LocallyFreeSheafFinitePoset.cohomology`.
+
+      OUTPUT:
+
+      A generator that yields the cohomology of the sheaves, one after the other, as
+      :meth:`LocallyFreeSheafFinitePoset.cohomology` would return it.
+    """
+    poset = None
+    pattern = None
+    pattern_ranks = None
+    for sheaf in sheaves:
+        if poset is None:
+            poset = sheaf._domain_poset
+            base_ring = sheaf._base_ring
+            index = chain_index(poset)
+            dim = index.dimension()
+            if degree is None:
+                degrees = list(range(dim + 1))
+            else:
+                degrees = [p for p in (degree - 1, degree) if 0 <= p <= dim]
+        elif not (sheaf._domain_poset == poset and sheaf._base_ring == base_ring):
+            raise ValueError("Sheaves are not defined on same poset or not defined over same ring")
+
+        ranks = tuple(sheaf._compact.ranks())
+        if pattern is None or pattern_ranks != ranks:
+            pattern = _GodementPattern(sheaf, degrees)
+            pattern_ranks = ranks
+        complex = pattern.cochain_complex(sheaf)
+        if ranks_only:
+            complex_degrees = [degree] if degree is not None else sorted(p for p in complex.differential() if p >= 0)
+            if reduced:
+                complex = morse_reduction(complex)[0]
+            result = betti_numbers(complex, complex_degrees, primes)
+            yield result[degree] if degree is not None else result
+            continue
+        if degree is not None:
+            if reduced:
+                complex = morse_reduction(complex)[0]
+            with profile_phase("homology", degree):
+                result = complex.homology(degree)
+            # the phase must not stay open while the caller handles the result
+            yield result
+            continue
+        # the degrees of the unreduced complex, as in ``cohomology()``
+        complex_degrees = complex.nonzero_degrees()
+        if reduced:
+            complex = morse_reduction(complex)[0]
+        with profile_phase("homology", degree):
+            result = {p:complex.homology(p) for p in complex_degrees}
+        yield result
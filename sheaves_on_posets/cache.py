@@ -0,0 +1,284 @@
+"""
+  Caches for Objects Built from Sheaves.
+"""
+
+# imports
+import os
+import json
+import shutil
+import fcntl
+import tempfile
+from collections import OrderedDict
+
+import numpy
+
+from .codec import ring_code, matrices_to_arrays, arrays_to_matrices
+
+#-------------------------------------------------------------------------------
+# Number of module objects, such as stalks and restriction maps, that are cached per object.
+MODULE_CACHE_SIZE = 128
+
+# The fraction of its size cap that a persistent cache is reduced to when it is full.
+EVICTION_RATIO = 0.75
+
+class LRUCache(object):
+    """
+      A cache with at most ``maxsize`` entries. When it is full, the least recently
+      used entry is dropped.
+
+      INPUT:
+
+      - ``maxsize`` -- (default: ``128``); the maximal number of entries.
+    """
+    def __init__(self, maxsize=128):
+        """
+          Constructor of :class:`LRUCache`
+        """
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key, compute):
+        """
+          Return the entry for ``key``. If there is none, it is computed by calling
+          ``compute`` without arguments, and stored.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        value = compute()
+        self._entries[key] = value
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """
+          Remove all entries.
+        """
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+class PersistentCache(object):
+    """
+      A cache of computed data of sheaves in a local directory, shared between runs and
+      processes.
+
+      Every entry is a directory ``entries/<key>/<name>`` with a file ``meta.json`` and
+      ``int64`` arrays in ``.npy`` files, which are memory-mapped when they are loaded.
+      Entries are written to a temporary directory first and then renamed into place,
+      so readers never see half-written entries. The entries and their sizes are kept in
+      an index in memory, in the order of their last use, so storing an entry does not
+      scan the directory. When the total size of the entries exceeds ``max_bytes``, the
+      index is synchronized with the directory, which other processes may have changed,
+      and the least recently used entries are removed until the total size is at most
+      ``EVICTION_RATIO`` times ``max_bytes``; this is done under a file lock. Hits, misses,
+      stores and evictions of this object are counted, see :meth:`stats`.
+
+      INPUT:
+
+      - ``directory`` -- the directory of the cache, which is created if needed.
+
+      - ``max_bytes`` -- (default: ``2**30``); the size cap of the cache.
+    """
+    def __init__(self, directory, max_bytes=2**30):
+        """
+          Constructor of :class:`PersistentCache`
+        """
+        self._directory = os.path.abspath(directory)
+        self._max_bytes = max_bytes
+        for sub in ("entries", "tmp"):
+            os.makedirs(os.path.join(self._directory, sub), exist_ok=True)
+        self._stats = {"hits":0, "misses":0, "stores":0, "evictions":0}
+        self._index = None
+        self._bytes = 0
+
+    def directory(self):
+        """
+          Return the directory of the cache.
+        """
+        return self._directory
+
+    def _entry_path(self, key, name):
+        return os.path.join(self._directory, "entries", key, name)
+
+    def get(self, key, name):
+        """
+          Return the pair ``(meta, arrays)`` of the entry ``name`` for the sheaf with hash
+          ``key``, or ``None`` if there is no such entry.
+        """
+        path = self._entry_path(key, name)
+        try:
+            with open(os.path.join(path, "meta.json")) as meta_file:
+                meta = json.load(meta_file)
+            arrays = {array_name:numpy.load(os.path.join(path, array_name + ".npy"), mmap_mode="r") for array_name in meta["arrays"]}
+            os.utime(os.path.join(path, "meta.json"))
+        except (OSError, ValueError, KeyError):
+            # missing, or evicted while it was read
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        if self._index is not None and path in self._index:
+            self._index.move_to_end(path)
+        return meta["data"], arrays
+
+    def put(self, key, name, meta, arrays):
+        """
+          Store the entry ``name`` for the sheaf with hash ``key``, with the JSON-serializable
+          data ``meta`` and the dictionary ``arrays`` of numpy arrays.
+        """
+        path = self._entry_path(key, name)
+        if os.path.exists(path):
+            return
+        tmp = tempfile.mkdtemp(dir=os.path.join(self._directory, "tmp"))
+        for array_name, array in arrays.items():
+            numpy.save(os.path.join(tmp, array_name + ".npy"), array)
+        with open(os.path.join(tmp, "meta.json"), "w") as meta_file:
+            json.dump({"data":meta, "arrays":sorted(arrays)}, meta_file)
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        # the index must not contain the new entry yet
+        self._load_index()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # another process stored the same entry first
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self._stats["stores"] += 1
+        self._index[path] = size
+        self._bytes += size
+        if self._bytes > self._max_bytes:
+            self._evict()
+
+    def _entries(self):
+        """
+          Return the list of triples ``(last_use, size, path)`` of all entries.
+        """
+        entries = []
+        root = os.path.join(self._directory, "entries")
+        for key in os.listdir(root):
+            for name in os.listdir(os.path.join(root, key)):
+                path = os.path.join(root, key, name)
+                try:
+                    last_use = os.path.getmtime(os.path.join(path, "meta.json"))
+                    size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                except OSError:
+                    continue
+                entries.append((last_use, size, path))
+        return entries
+
+    def _load_index(self, reload=False):
+        """
+          Build the index of the entries from the directory, if it is not built yet or if
+          ``reload`` is ``True``.
+        """
+        if self._index is not None and not reload:
+            return
+        self._index = OrderedDict((path, size) for last_use, size, path in sorted(self._entries()))
+        self._bytes = sum(self._index.values())
+
+    def size(self):
+        """
+          Return the total size of the entries in bytes, according to the index.
+        """
+        self._load_index()
+        return self._bytes
+
+    def _evict(self):
+        """
+          Remove the least recently used entries until the total size is at most
+          ``EVICTION_RATIO`` times the size cap.
+        """
+        with open(os.path.join(self._directory, "lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._load_index(reload=True)
+            while self._index and self._bytes > EVICTION_RATIO*self._max_bytes:
+                path, size = self._index.popitem(last=False)
+                self._remove(path)
+                self._bytes -= size
+                self._stats["evictions"] += 1
+
+    def _remove(self, path):
+        tmp = tempfile.mkdtemp(dir=os.path.join(self._directory, "tmp"))
+        try:
+            os.rename(path, os.path.join(tmp, "entry"))
+        except OSError:
+            pass
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    def clear(self):
+        """
+          Remove all entries.
+        """
+        with open(os.path.join(self._directory, "lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            for last_use, size, path in self._entries():
+                self._remove(path)
+            self._index = OrderedDict()
+            self._bytes = 0
+
+    def stats(self):
+        """
+          Return a dictionary with the numbers of hits, misses, stores and evictions of
+          ``self``, and the current size of the cache in bytes.
+        """
+        stats = dict(self._stats)
+        stats["bytes"] = self.size()
+        return stats
+
+    def load_matrices(self, key, name, base_ring):
+        """
+          Return the pair ``(labels, matrices)`` stored with :meth:`store_matrices`, or ``None``.
+        """
+        entry = self.get(key, name)
+        if entry is None:
+            return None
+        meta, arrays = entry
+        return meta["labels"], arrays_to_matrices(arrays, meta["shapes"], base_ring)
+
+    def store_matrices(self, key, name, base_ring, labels, matrices):
+        """
+          Store the list ``matrices`` of matrices over ``base_ring``, together with the
+          JSON-serializable list ``labels``, see :func:`matrices_to_arrays`. Nothing is
+          stored if an entry does not fit in 64 bits.
+        """
+        arrays = matrices_to_arrays(matrices, base_ring)
+        if arrays is not None:
+            shapes = [list(mat.dimensions()) for mat in matrices]
+            self.put(key, name, {"labels":labels, "shapes":shapes}, arrays)
+
+    def __repr__(self):
+        return "Persistent cache in {}".format(self._directory)
+
+_persistent_cache = None
+
+def set_persistent_cache(directory=None, max_bytes=2**30):
+    """
+      Enable the persistent cache in ``directory``, or disable it if ``directory`` is ``None``.
+
+      While it is enabled, the restriction tables, Godement cochain complexes and cohomology
+      of sheaves over ``ZZ``, ``QQ`` and prime fields are looked up in the cache before they
+      are computed, and stored in it afterwards. Sheaves are identified by
+      :meth:`CompactSheaf.content_hash`.
+
+      OUTPUT:
+
+      The :class:`PersistentCache`, or ``None``.
+    """
+    global _persistent_cache
+    _persistent_cache = None if directory is None else PersistentCache(directory, max_bytes)
+    return _persistent_cache
+
+def persistent_cache(base_ring=None):
+    """
+      Return the enabled :class:`PersistentCache`, or ``None``. If ``base_ring`` is given,
+      ``None`` is also returned if data over ``base_ring`` cannot be stored.
+    """
+    if base_ring is not None and ring_code(base_ring) is None:
+        return None
+    return _persistent_cache
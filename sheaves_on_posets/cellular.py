@@ -0,0 +1,173 @@
+"""
+  Cell Dimensions and Incidence Signs of Face Posets of Regular CW Complexes.
+"""
+
+# imports
+from sage.matrix.constructor import matrix
+from sage.rings.integer_ring import ZZ
+
+from .chain_index import chain_index, _bits
+
+#-------------------------------------------------------------------------------
+def _cell_dimensions(index):
+    """
+      Return the list of dimensions of the points of the poset of ``index``, viewed
+      as cells. The minimal points have dimension 0 and every cover relation raises
+      the dimension by one.
+    """
+    dimensions = [None]*index.cardinality()
+    for i in range(index.cardinality()):
+        if dimensions[i] is None:
+            dimensions[i] = 0
+        for j in index.upper_covers(i):
+            if dimensions[j] is None:
+                dimensions[j] = dimensions[i] + 1
+            elif dimensions[j] != dimensions[i] + 1:
+                raise ValueError("The poset is not graded, so it is not the face poset of a regular CW complex.")
+    return dimensions
+
+def _lower_covers(index):
+    """
+      Return the lists of lower covers of the points of the poset of ``index``.
+    """
+    lower_covers = [[] for i in range(index.cardinality())]
+    for i, j in index.cover_relations():
+        lower_covers[j].append(i)
+    return lower_covers
+
+def _check_cell_boundaries(index, dimensions, lower_covers, signs):
+    """
+      Check that the boundary of every cell of dimension ``k >= 2`` has the integral
+      homology of a sphere of dimension ``k-1``, in terms of point numbers. The cells
+      of dimension 0 and 1 are checked by :func:`_incidence_signs`.
+
+      The cells are checked in the order of their dimensions. Once the boundaries of
+      the cells below a cell are spheres, these cells form a regular CW complex, so the
+      homology of the boundary is that of its cellular chain complex with the incidence
+      signs ``signs``, which only involves the cells below the cell.
+    """
+    for z in sorted(range(index.cardinality()), key=lambda i: dimensions[i]):
+        k = dimensions[z]
+        if k < 2:
+            continue
+        cells = [[] for p in range(k)]
+        for x in _bits(index.down_set(z)):
+            cells[dimensions[x]].append(x)
+        positions = [{x:n for n, x in enumerate(level)} for level in cells]
+        # the boundary maps, with the augmentation from the vertices to degree -1
+        ranks = [1] + [len(level) for level in cells]
+        boundary_ranks = [0]*(k + 2)
+        torsion = False
+        for p in range(k):
+            if p == 0:
+                differential = matrix(ZZ, 1, len(cells[0]), [1]*len(cells[0]))
+            else:
+                entries = {(positions[p - 1][x], col):signs[(x, y)] for col, y in enumerate(cells[p]) for x in lower_covers[y]}
+                differential = matrix(ZZ, len(cells[p - 1]), len(cells[p]), entries)
+            divisors = [d for d in differential.elementary_divisors() if d != 0]
+            boundary_ranks[p + 1] = len(divisors)
+            torsion = torsion or any(d != 1 for d in divisors)
+        # the reduced Betti numbers in the degrees -1 to k-1
+        betti_numbers = [ranks[p] - boundary_ranks[p] - boundary_ranks[p + 1] for p in range(k + 1)]
+        if torsion or betti_numbers != [0]*k + [1]:
+            raise ValueError("The boundary of {} does not have the homology of a sphere of dimension {}, so the poset is not the face poset of a regular CW complex.".format(index.point(z), k - 1))
+
+def _incidence_signs(index, check=False):
+    """
+      Compute incidence signs for the cover relations of the poset of ``index``, in
+      terms of point numbers.
+
+      The facets of every cell of dimension at least 2 are oriented one after the other:
+      two facets that share a ridge must induce opposite orientations on it. A cell of
+      dimension 1 must have exactly two vertices, which get opposite signs. If ``check``
+      is ``True``, the boundaries of the cells are checked with :func:`_check_cell_boundaries`.
+    """
+    dimensions = _cell_dimensions(index)
+    lower_covers = _lower_covers(index)
+    signs = dict()
+    for z in sorted(range(index.cardinality()), key=lambda i: dimensions[i]):
+        facets = lower_covers[z]
+        if dimensions[z] == 0:
+            continue
+        if dimensions[z] == 1:
+            if len(facets) != 2:
+                raise ValueError("The point {} covers {} points instead of 2, so the poset is not the face poset of a regular CW complex.".format(index.point(z), len(facets)))
+            signs[(facets[0], z)] = 1
+            signs[(facets[1], z)] = -1
+            continue
+
+        # every ridge of z lies in exactly two facets of z
+        ridges = dict()
+        for y in facets:
+            for x in lower_covers[y]:
+                ridges.setdefault(x, []).append(y)
+        for x, pair in ridges.items():
+            if len(pair) != 2:
+                raise ValueError("The interval from {} to {} is not a diamond, so the poset is not the face poset of a regular CW complex.".format(index.point(x), index.point(z)))
+
+        signs[(facets[0], z)] = 1
+        queue = [facets[0]]
+        while queue:
+            y = queue.pop()
+            for x in lower_covers[y]:
+                pair = ridges[x]
+                other = pair[1] if pair[0] == y else pair[0]
+                sign = -signs[(y, z)]*signs[(x, y)]*signs[(x, other)]
+                if (other, z) not in signs:
+                    signs[(other, z)] = sign
+                    queue.append(other)
+                elif signs[(other, z)] != sign:
+                    raise ValueError("The boundary of {} is not orientable, so the poset is not the face poset of a regular CW complex.".format(index.point(z)))
+        if any((y, z) not in signs for y in facets):
+            raise ValueError("The boundary of {} is not connected, so the poset is not the face poset of a regular CW complex.".format(index.point(z)))
+    if check:
+        _check_cell_boundaries(index, dimensions, lower_covers, signs)
+    return signs
+
+def _check_incidence_signs(index, signs, check=False):
+    """
+      Check that the incidence signs ``signs``, in terms of point numbers, make the
+      cellular differentials square to zero. If ``check`` is ``True``, also check that
+      the boundaries of the cells are spheres in homology, see :func:`_check_cell_boundaries`.
+    """
+    dimensions = _cell_dimensions(index)
+    lower_covers = _lower_covers(index)
+    for z in range(index.cardinality()):
+        if any(signs[(y, z)] not in (1, -1) for y in lower_covers[z]):
+            raise ValueError("Incidence signs must be 1 or -1.")
+        if dimensions[z] == 1:
+            if sum(signs[(y, z)] for y in lower_covers[z]) != 0:
+                raise ValueError("The incidence signs of the vertices of {} do not add up to zero.".format(index.point(z)))
+            continue
+        sums = dict()
+        for y in lower_covers[z]:
+            for x in lower_covers[y]:
+                sums[x] = sums.get(x, 0) + signs[(y, z)]*signs[(x, y)]
+        for x, total in sums.items():
+            if total != 0:
+                raise ValueError("The incidence signs on the interval from {} to {} do not add up to zero.".format(index.point(x), index.point(z)))
+    if check:
+        _check_cell_boundaries(index, dimensions, lower_covers, signs)
+
+def incidence_signs(poset, check=False):
+    """
+      Return incidence signs for the face poset ``poset`` of a regular CW complex.
+
+      INPUT:
+
+      - ``poset`` -- a finite poset.
+
+      - ``check`` -- (default: ``False``); if ``True``, it is also checked that the
+          boundary of every cell has the homology of a sphere. Without this check, some
+          posets that are not face posets of regular CW complexes are accepted.
+
+      OUTPUT:
+
+      A dictionary that maps every cover relation ``(a, b)`` of ``poset`` (as a tuple)
+      to ``1`` or ``-1``, such that the corresponding cellular boundary maps square to
+      zero. A ``ValueError`` is raised if ``poset`` is found not to be the face poset of
+      a regular CW complex.
+    """
+    index = chain_index(poset)
+    signs = _incidence_signs(index, check)
+    return {(index.point(i), index.point(j)):sign for (i, j), sign in signs.items()}
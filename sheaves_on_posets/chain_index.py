@@ -0,0 +1,313 @@
+"""
+  Index of the chains of a finite poset.
+"""
+
+# imports
+from array import array
+from bisect import bisect_left, bisect_right
+
+from .instrument import active_report, profile_phase
+
+#-------------------------------------------------------------------------------
+def _bits(bitset):
+    """
+      Iterate over the positions of the bits set in the integer ``bitset``,
+      in increasing order.
+    """
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+def chain_index(poset):
+    """
+      Return the :class:`ChainIndex` of ``poset``. The index is built once per poset
+      and shared by all sheaves on it. It is kept as an attribute of the poset, so it
+      is freed together with the poset.
+    """
+    try:
+        return poset._sheaves_chain_index
+    except AttributeError:
+        index = ChainIndex(poset)
+        poset._sheaves_chain_index = index
+        return index
+
+class ChainIndex(object):
+    """
+      The chains of a finite poset, enumerated once and grouped by length.
+
+      The points of the poset are numbered ``0, ..., n-1`` along the linear extension
+      ``poset.list()``, and a chain is encoded as the increasing tuple of the numbers
+      of its points. A chain with ``p+1`` points is called a ``p``-chain. The ``p``-chains
+      are generated from the ``(p-1)``-chains by extending them with the points above
+      their last point, so that every level is sorted lexicographically. The levels are
+      stored as flat integer arrays and only generated when they are asked for.
+
+      INPUT:
+
+      - ``poset`` -- a finite poset.
+    """
+    def __init__(self, poset):
+        """
+          Constructor of :class:`ChainIndex`
+        """
+        self._points = poset.list()
+        self._point_index = {x:i for i, x in enumerate(self._points)}
+        n = len(self._points)
+
+        # upper covers in compressed sparse row form
+        upper_covers = [[] for i in range(n)]
+        for a, b in poset.cover_relations_iterator():
+            upper_covers[self._point_index[a]].append(self._point_index[b])
+        self._cover_ptr = array('l', [0])
+        self._cover_idx = array('i')
+        for covers in upper_covers:
+            self._cover_idx.extend(sorted(covers))
+            self._cover_ptr.append(len(self._cover_idx))
+
+        # strict up-sets and down-sets as bitsets, and the dimension
+        self._up_sets = [0]*n
+        self._down_sets = [0]*n
+        heights = [0]*n
+        for i in reversed(range(n)):
+            for j in upper_covers[i]:
+                self._up_sets[i] |= self._up_sets[j] | (1 << j)
+                heights[i] = max(heights[i], heights[j] + 1)
+        for i in range(n):
+            for j in upper_covers[i]:
+                self._down_sets[j] |= self._down_sets[i] | (1 << i)
+        self._dimension = max(heights) if n else -1
+
+        self._levels = [array('i', range(n))]
+        self._positions = [{(i,):i for i in range(n)}]
+        self._face_arrays = dict()
+
+    def cardinality(self):
+        """
+          Return the number of points of the poset.
+        """
+        return len(self._points)
+
+    def points(self):
+        """
+          Return the points of the poset, in the order of their numbering.
+        """
+        return self._points
+
+    def point(self, i):
+        """
+          Return the point with number ``i``.
+        """
+        return self._points[i]
+
+    def point_index(self, point):
+        """
+          Return the number of ``point``.
+        """
+        return self._point_index[point]
+
+    def chain_points(self, chain):
+        """
+          Return the list of points of the encoded chain ``chain``.
+        """
+        return [self._points[i] for i in chain]
+
+    def upper_covers(self, i):
+        """
+          Return the numbers of the upper covers of the point with number ``i``.
+        """
+        return self._cover_idx[self._cover_ptr[i]:self._cover_ptr[i+1]]
+
+    def cover_relations(self):
+        """
+          Iterate over the cover relations ``(i, j)`` of the poset, in terms of point numbers.
+          The ``e``-th relation of this iteration is called the cover edge ``e``.
+        """
+        for i in range(len(self._points)):
+            for j in self.upper_covers(i):
+                yield (i, j)
+
+    def ncovers(self):
+        """
+          Return the number of cover relations of the poset.
+        """
+        return len(self._cover_idx)
+
+    def cover_edges(self, i):
+        """
+          Return the range of the cover edges from the point with number ``i`` to its upper covers.
+        """
+        return range(self._cover_ptr[i], self._cover_ptr[i+1])
+
+    def cover_source(self, e):
+        """
+          Return the number of the lower point of the cover edge ``e``.
+        """
+        return bisect_right(self._cover_ptr, e) - 1
+
+    def cover_target(self, e):
+        """
+          Return the number of the upper point of the cover edge ``e``.
+        """
+        return self._cover_idx[e]
+
+    def cover_edge(self, i, j):
+        """
+          Return the cover edge from the point with number ``i`` to its upper cover with number ``j``.
+        """
+        start, stop = self._cover_ptr[i], self._cover_ptr[i+1]
+        e = bisect_left(self._cover_idx, j, start, stop)
+        if e == stop or self._cover_idx[e] != j:
+            raise ValueError("{} is not covered by {}".format(self._points[i], self._points[j]))
+        return e
+
+    def up_set(self, i):
+        """
+          Return the bitset of the points strictly above the point with number ``i``.
+        """
+        return self._up_sets[i]
+
+    def down_set(self, i):
+        """
+          Return the bitset of the points strictly below the point with number ``i``.
+        """
+        return self._down_sets[i]
+
+    def points_above(self, i):
+        """
+          Iterate over the numbers of the points strictly above the point with number ``i``.
+        """
+        return _bits(self._up_sets[i])
+
+    def points_below(self, i):
+        """
+          Iterate over the numbers of the points strictly below the point with number ``i``.
+        """
+        return _bits(self._down_sets[i])
+
+    def is_lequal(self, i, j):
+        """
+          Return whether the point with number ``i`` is below the point with number ``j``.
+        """
+        return i == j or bool(self._up_sets[i] >> j & 1)
+
+    def dimension(self):
+        """
+          Return the dimension of the poset, that is, the largest ``p`` for which
+          there are ``p``-chains.
+        """
+        return self._dimension
+
+    def _level(self, p):
+        """
+          Return the flat array of the ``p``-chains, generating the missing levels.
+        """
+        while len(self._levels) <= p:
+            q = len(self._levels)
+            previous = self._levels[-1]
+            level = array('i')
+            positions = dict()
+            with profile_phase("chains", q):
+                for start in range(0, len(previous), q):
+                    chain = previous[start:start + q]
+                    for j in _bits(self._up_sets[chain[-1]]):
+                        positions[tuple(chain) + (j,)] = len(positions)
+                        level.extend(chain)
+                        level.append(j)
+            self._levels.append(level)
+            self._positions.append(positions)
+            if active_report() is not None:
+                active_report().record_chains(q, len(positions))
+        return self._levels[p]
+
+    def chain_array(self, p):
+        """
+          Return the flat array of the ``p``-chains, ``p+1`` entries per chain.
+        """
+        if p < 0 or p > self._dimension:
+            return array('i')
+        return self._level(p)
+
+    def nchains(self, p):
+        """
+          Return the number of ``p``-chains.
+        """
+        if p < 0 or p > self._dimension:
+            return 0
+        return len(self._level(p)) // (p + 1)
+
+    def chain(self, p, k):
+        """
+          Return the ``k``-th ``p``-chain.
+        """
+        return tuple(self._level(p)[k*(p+1):(k+1)*(p+1)])
+
+    def chains(self, p):
+        """
+          Iterate over the ``p``-chains, in order.
+        """
+        if p < 0 or p > self._dimension:
+            return
+        level = self._level(p)
+        for start in range(0, len(level), p + 1):
+            yield tuple(level[start:start + p + 1])
+
+    def last_points(self, p):
+        """
+          Return the array of the last points of the ``p``-chains.
+        """
+        if p < 0 or p > self._dimension:
+            return array('i')
+        return self._level(p)[p::p+1]
+
+    def position(self, chain):
+        """
+          Return the position of the encoded chain ``chain`` among the chains of its length.
+        """
+        p = len(chain) - 1
+        self._level(p)
+        return self._positions[p][tuple(chain)]
+
+    def faces(self, p, k):
+        """
+          Return the positions of the faces of the ``k``-th ``p``-chain. The ``j``-th entry
+          is the position of the ``(p-1)``-chain obtained by leaving out the ``j``-th point.
+        """
+        return self.face_array(p)[k*(p+1):(k+1)*(p+1)]
+
+    def face_array(self, p):
+        """
+          Return the flat array of the positions of the faces of all ``p``-chains,
+          ``p+1`` entries per chain. The arrays are cached.
+        """
+        if p not in self._face_arrays:
+            faces = array('l')
+            if p >= 1:
+                self._level(p)
+                positions = self._positions[p-1]
+                with profile_phase("faces", p):
+                    for chain in self.chains(p):
+                        for j in range(p + 1):
+                            faces.append(positions[chain[:j] + chain[j+1:]])
+            self._face_arrays[p] = faces
+        return self._face_arrays[p]
+
+    def cofaces(self, p, k):
+        """
+          Iterate over the pairs ``(j, position)`` of the ``(p+1)``-chains that contain
+          the ``k``-th ``p``-chain, where ``j`` is the index of the added point.
+        """
+        if p + 1 > self._dimension:
+            return
+        chain = self.chain(p, k)
+        self._level(p + 1)
+        positions = self._positions[p + 1]
+        for j in range(p + 2):
+            candidates = self._up_sets[chain[j-1]] if j > 0 else (1 << len(self._points)) - 1
+            if j <= p:
+                candidates &= self._down_sets[chain[j]]
+            for z in _bits(candidates):
+                yield (j, positions[chain[:j] + (z,) + chain[j:]])
+
+    def __repr__(self):
+        return "Chain index of a poset with {} points".format(len(self._points))
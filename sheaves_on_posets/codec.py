@@ -0,0 +1,88 @@
+"""
+  Encoding of Lists of Matrices as Concatenated Sparse Coordinate Arrays.
+"""
+
+# imports
+import numpy
+
+from sage.rings.integer_ring import ZZ
+from sage.rings.rational_field import QQ
+from sage.rings.finite_rings.finite_field_constructor import GF
+from sage.matrix.constructor import matrix
+
+#-------------------------------------------------------------------------------
+INT64_BOUND = 2**63
+
+def ring_code(base_ring):
+    """
+      Return the string that identifies ``base_ring``: ``"ZZ"``, ``"QQ"`` or ``"GF(p)"``
+      for a prime ``p``. For other rings, ``None`` is returned.
+    """
+    if base_ring is ZZ:
+        return "ZZ"
+    if base_ring is QQ:
+        return "QQ"
+    if base_ring.is_field() and base_ring.is_finite() and base_ring.is_prime_field():
+        return "GF({})".format(base_ring.characteristic())
+    return None
+
+def ring_from_code(code):
+    """
+      Return the ring identified by ``code``, see :func:`ring_code`.
+    """
+    if code == "ZZ":
+        return ZZ
+    if code == "QQ":
+        return QQ
+    if code.startswith("GF(") and code.endswith(")"):
+        return GF(int(code[3:-1]))
+    raise ValueError("Unknown ring code {}".format(code))
+
+def matrices_to_arrays(matrices, base_ring):
+    """
+      Encode the list ``matrices`` of matrices over ``base_ring`` as a dictionary of
+      ``int64`` arrays: the nonzero entries of all matrices are concatenated, with the
+      row and column indices in ``rows`` and ``cols``, the values in ``num`` (and their
+      denominators in ``den`` over ``QQ``), and the start of the entries of every matrix
+      followed by the total number of entries in ``ptr``. Entries over ``GF(p)`` are
+      stored as integers between ``0`` and ``p-1``.
+
+      Returns ``None`` if an entry does not fit in 64 bits.
+    """
+    rows, cols, num, den, ptr = [], [], [], [], [0]
+    for mat in matrices:
+        for (i, j), value in sorted(mat.dict().items()):
+            if base_ring is ZZ:
+                numerator, denominator = int(value), 1
+            elif base_ring is QQ:
+                numerator, denominator = int(value.numerator()), int(value.denominator())
+            else:
+                numerator, denominator = int(value.lift()), 1
+            if not (-INT64_BOUND <= numerator < INT64_BOUND and denominator < INT64_BOUND):
+                return None
+            rows.append(i)
+            cols.append(j)
+            num.append(numerator)
+            den.append(denominator)
+        ptr.append(len(rows))
+    arrays = {"rows":numpy.array(rows, dtype=numpy.int64), "cols":numpy.array(cols, dtype=numpy.int64),
+              "num":numpy.array(num, dtype=numpy.int64), "ptr":numpy.array(ptr, dtype=numpy.int64)}
+    if base_ring is QQ:
+        arrays["den"] = numpy.array(den, dtype=numpy.int64)
+    return arrays
+
+def arrays_to_matrices(arrays, shapes, base_ring):
+    """
+      Decode the arrays ``arrays`` of :func:`matrices_to_arrays` into the list of sparse
+      matrices over ``base_ring`` with the shapes ``shapes``, given as pairs ``(nrows, ncols)``.
+    """
+    rows, cols, num, ptr = arrays["rows"], arrays["cols"], arrays["num"], arrays["ptr"]
+    den = arrays.get("den")
+    matrices = []
+    for k, (nrows, ncols) in enumerate(shapes):
+        entries = dict()
+        for l in range(int(ptr[k]), int(ptr[k + 1])):
+            value = int(num[l]) if den is None else QQ((int(num[l]), int(den[l])))
+            entries[(int(rows[l]), int(cols[l]))] = base_ring(value)
+        matrices.append(matrix(base_ring, nrows, ncols, entries, sparse=True))
+    return matrices
@@ -0,0 +1,262 @@
+"""
+  Compact Array-Backed Form of Locally Free Sheaves on Finite Posets.
+"""
+
+# imports
+import hashlib
+from array import array
+
+from sage.matrix.special import identity_matrix
+from sage.matrix.constructor import matrix
+from sage.misc.prandom import sample as random_sample
+
+from .chain_index import chain_index
+from .cache import persistent_cache
+from .instrument import profile_phase
+
+#-------------------------------------------------------------------------------
+def compact_sheaf(stalk_dict, res_dict, base_ring, domain_poset):
+    """
+      Return the :class:`CompactSheaf` of the sheaf given by the dictionaries ``stalk_dict``
+      and ``res_dict``, as for :class:`LocallyFreeSheafFinitePoset`. The inputs ``0`` and ``1``
+      for restriction maps are replaced by zero and identity matrices.
+    """
+    index = chain_index(domain_poset)
+    points = index.points()
+    ranks = [stalk_dict[x] for x in points]
+    blocks = []
+    for i, j in index.cover_relations():
+        try:
+            value = res_dict[(points[i], points[j])]
+        except KeyError:
+            raise ValueError("No restriction map is given for the cover relation ({}, {})".format(points[i], points[j]))
+        if value == 0:
+            block = matrix(base_ring, ranks[j], ranks[i])
+        elif value == 1:
+            block = identity_matrix(base_ring, ranks[i])
+        else:
+            block = matrix(base_ring, value)
+        blocks.append(block)
+    return CompactSheaf(index, base_ring, ranks, blocks)
+
+def summand_offsets(summands):
+    """
+      Return the offsets of the summands ``summands``, instances of :class:`CompactSheaf`,
+      in the stalks of their direct sum: a list with for every summand the array of the offsets of
+      its stalks, indexed by point number, followed by the array of the stalk ranks of the sum.
+    """
+    n = summands[0]._index.cardinality()
+    offsets = [array('l', [0]*n)]
+    for summand in summands:
+        offsets.append(array('l', [offsets[-1][i] + summand._ranks[i] for i in range(n)]))
+    return offsets
+
+class CompactSheaf(object):
+    """
+      A locally free sheaf on a finite poset, stored with integer-indexed points.
+
+      The points are numbered along the linear extension of the chain index of the
+      poset. The stalk ranks are stored in an integer array, together with their prefix
+      sums, the offsets of the stalks in the direct sum of all stalks. The cover relations
+      are the cover edges of the chain index, which are stored in compressed sparse row
+      form, and the matrices of the restriction maps along them are stored in one list
+      indexed by cover edge. All matrices are immutable.
+
+      INPUT:
+
+      - ``index`` -- the :class:`ChainIndex` of the domain poset.
+
+      - ``base_ring`` -- the base ring.
+
+      - ``ranks`` -- the stalk ranks, indexed by point number.
+
+      - ``blocks`` -- the matrices of the restriction maps, indexed by cover edge.
+    """
+    def __init__(self, index, base_ring, ranks, blocks):
+        """
+          Constructor of :class:`CompactSheaf`
+        """
+        self._index = index
+        self._base_ring = base_ring
+        self._ranks = array('l', ranks)
+        self._offsets = array('l', [0])
+        for rank in self._ranks:
+            self._offsets.append(self._offsets[-1] + rank)
+        for block in blocks:
+            block.set_immutable()
+        self._blocks = blocks
+        self._table = None
+        self._hash = None
+
+    def index(self):
+        """
+          Return the chain index of the domain poset.
+        """
+        return self._index
+
+    def base_ring(self):
+        """
+          Return the base ring.
+        """
+        return self._base_ring
+
+    def ranks(self):
+        """
+          Return the array of stalk ranks.
+        """
+        return self._ranks
+
+    def rank(self, i):
+        """
+          Return the rank of the stalk at the point with number ``i``.
+        """
+        return self._ranks[i]
+
+    def offsets(self):
+        """
+          Return the array of the offsets of the stalks, followed by the sum of the ranks.
+        """
+        return self._offsets
+
+    def cover_block(self, e):
+        """
+          Return the matrix of the restriction map along the cover edge ``e``.
+        """
+        return self._blocks[e]
+
+    def cover_matrix(self, i, j):
+        """
+          Return the matrix of the restriction map from the point with number ``i`` to its
+          upper cover with number ``j``.
+        """
+        return self._blocks[self._index.cover_edge(i, j)]
+
+    def restriction(self, i, j):
+        """
+          Return the matrix of the restriction map from the point with number ``i`` to the
+          point with number ``j``, which must lie above it.
+
+          All restriction matrices are computed at once on the first call, see :meth:`_restriction_table`.
+        """
+        if self._table is None:
+            with profile_phase("restriction_table"):
+                self._table = self._restriction_table()
+        return self._table[(i, j)]
+
+    def _restriction_table(self):
+        """
+          Return the dictionary of all restriction matrices, keyed by pairs of point numbers.
+
+          The table is built by walking through the poset from the top down: the restriction
+          from ``i`` to ``j`` is obtained from the restriction from an upper cover of ``i`` to
+          ``j`` with a single matrix product. If the persistent cache is enabled, the table is
+          looked up there first, see :func:`set_persistent_cache`.
+        """
+        cache = persistent_cache(self._base_ring)
+        if cache is not None:
+            cached = cache.load_matrices(self.content_hash(), "restrictions", self._base_ring)
+            if cached is not None:
+                table = dict()
+                for pair, mat in zip(*cached):
+                    mat.set_immutable()
+                    table[tuple(pair)] = mat
+                return table
+        index = self._index
+        table = dict()
+        for x in reversed(range(index.cardinality())):
+            identity = identity_matrix(self._base_ring, self._ranks[x])
+            identity.set_immutable()
+            table[(x, x)] = identity
+            for e in index.cover_edges(x):
+                c = index.cover_target(e)
+                cover = self._blocks[e]
+                table[(x, c)] = cover
+                for y in index.points_above(c):
+                    if (x, y) not in table:
+                        composite = table[(c, y)] * cover
+                        composite.set_immutable()
+                        table[(x, y)] = composite
+        if cache is not None:
+            pairs = sorted(table)
+            cache.store_matrices(self.content_hash(), "restrictions", self._base_ring, [list(pair) for pair in pairs], [table[pair] for pair in pairs])
+        return table
+
+    def content_hash(self):
+        """
+          Return a hash of the content of ``self``: the base ring, the points of the poset in
+          the order of their numbers, the cover relations, the stalk ranks and the entries of
+          the restriction matrices. Sheaves given by equal data on the same labelled poset have
+          the same hash, also in different processes.
+        """
+        if self._hash is None:
+            digest = hashlib.sha256()
+            digest.update(repr(self._base_ring).encode())
+            for x, rank in zip(self._index.points(), self._ranks):
+                digest.update("|{}:{}".format(repr(x), rank).encode())
+            for e, (i, j) in enumerate(self._index.cover_relations()):
+                digest.update("|{}<{}:{}".format(i, j, sorted(self._blocks[e].dict().items())).encode())
+            self._hash = digest.hexdigest()
+        return self._hash
+
+    def functoriality_violation(self, sample=None):
+        """
+          Return ``None`` if the restriction maps are functorial, and otherwise the first pair
+          ``(i, j)`` of point numbers for which the restriction maps are not compatible.
+
+          First the shapes of the cover blocks are checked. Then, for every cover edge from
+          ``i`` to ``c`` and every ``j >= c``, the restriction from ``c`` to ``j`` composed with
+          the cover block must be the restriction from ``i`` to ``j`` in the table of
+          :meth:`restriction`, which composes the blocks along one path. If ``sample`` is an
+          integer, only this many randomly chosen cover edges are checked in the second step.
+        """
+        index = self._index
+        edges = [(i, e) for i in range(index.cardinality()) for e in index.cover_edges(i)]
+        for i, e in edges:
+            if self._blocks[e].dimensions() != (self._ranks[index.cover_target(e)], self._ranks[i]):
+                return (i, index.cover_target(e))
+        if sample is not None and sample < len(edges):
+            edges = random_sample(edges, sample)
+        for i, e in edges:
+            c = index.cover_target(e)
+            cover = self._blocks[e]
+            for j in [c] + list(index.points_above(c)):
+                if self.restriction(c, j) * cover != self.restriction(i, j):
+                    return (i, j)
+        return None
+
+    def direct_sum(self, *others):
+        """
+          Return the direct sum of ``self`` and ``others``, which must be defined on the same
+          poset and over the same ring, see :func:`summand_offsets`. Every cover block is
+          assembled as a single sparse block diagonal matrix.
+        """
+        summands = (self,) + others
+        offsets = summand_offsets(summands)
+        index = self._index
+        ranks = offsets[-1]
+        blocks = []
+        for e, (i, j) in enumerate(index.cover_relations()):
+            entries = dict()
+            for k, summand in enumerate(summands):
+                row, col = offsets[k][j], offsets[k][i]
+                for (a, b), value in summand._blocks[e].dict().items():
+                    entries[(row + a, col + b)] = value
+            blocks.append(matrix(self._base_ring, ranks[j], ranks[i], entries, sparse=True))
+        return CompactSheaf(index, self._base_ring, ranks, blocks)
+
+    def stalk_dict(self):
+        """
+          Return the dictionary of stalk ranks, keyed by the points of the poset.
+        """
+        points = self._index.points()
+        return {points[i]:rank for i, rank in enumerate(self._ranks)}
+
+    def res_dict(self):
+        """
+          Return the dictionary of restriction matrices, keyed by the cover relations of the poset.
+        """
+        points = self._index.points()
+        return {(points[i], points[j]):self._blocks[e] for e, (i, j) in enumerate(self._index.cover_relations())}
+
+    def __repr__(self):
+        return "Compact locally free sheaf over {} with stalk ranks {}".format(self._base_ring, list(self._ranks))
@@ -0,0 +1,217 @@
+"""
+  Instrumentation of the Cohomology Computations.
+"""
+
+# imports
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+#-------------------------------------------------------------------------------
+class ProfileReport(object):
+    """
+      The measurements made while profiling is enabled, see :func:`profiling`.
+
+      Every phase of the computations is identified by its name and a degree, which is
+      ``None`` for phases that are not split by degree. The phase ``"total"`` covers the
+      whole time of profiling; the other phases are:
+
+      - ``"validation"`` -- the functoriality check of a sheaf;
+
+      - ``"restriction_table"`` -- the computation of all restriction matrices of a sheaf;
+
+      - ``"chains"`` and ``"faces"`` -- the enumeration of the ``p``-chains of a poset and of
+        the positions of their faces, for the degree ``p``; they are done once per poset;
+
+      - ``"differential"`` -- the assembly of the differential of the Godement cochain
+        complex from degree ``p``, or of all differentials if they are built on a pool;
+
+      - ``"total_differential"`` -- the assembly of the differential of the total Godement
+        complex of a complex of sheaves from degree ``n``;
+
+      - ``"homology"`` -- the homology of a cochain complex in degree ``p``, or in all
+        degrees if it is computed on a pool.
+
+      For every phase the number of calls and the total wall time are recorded, and if
+      memory is traced, the peak of the traced memory during the calls, in bytes. The shapes
+      and numbers of nonzero entries of the differentials and the numbers of chains of
+      every length are recorded too.
+
+      INPUT:
+
+      - ``callback`` -- (default: ``None``); a function that is called with the arguments
+        ``(event, data)`` for every measurement, where ``event`` is ``"phase"``, ``"matrix"``
+        or ``"chains"`` and ``data`` is the dictionary of the measurement.
+
+      - ``memory`` -- (default: ``False``); whether to trace the memory allocations with
+        ``tracemalloc``. This slows down the computations.
+    """
+    def __init__(self, callback=None, memory=False):
+        """
+          Constructor of :class:`ProfileReport`
+        """
+        self._callback = callback
+        self._memory = memory
+        self._phases = dict()
+        self._matrices = []
+        self._chains = dict()
+        self._open_peaks = []
+        self._peak_memory = None
+
+    def phases(self):
+        """
+          Return the dictionary that maps the pairs ``(name, degree)`` of the phases to the
+          dictionaries of their number of calls, total time and peak memory.
+        """
+        return self._phases
+
+    def matrices(self):
+        """
+          Return the list of the dictionaries with the name, degree, shape and number of
+          nonzero entries of every recorded matrix.
+        """
+        return self._matrices
+
+    def chain_counts(self):
+        """
+          Return the dictionary that maps ``p`` to the number of ``p``-chains, for the chains
+          enumerated while profiling.
+        """
+        return self._chains
+
+    def total_time(self, name):
+        """
+          Return the total time of the phases called ``name``, over all degrees.
+        """
+        return sum(record["time"] for (phase, degree), record in self._phases.items() if phase == name)
+
+    def peak_memory(self):
+        """
+          Return the peak of the traced memory while profiling, or ``None`` if memory was
+          not traced.
+        """
+        return self._peak_memory
+
+    @contextmanager
+    def phase(self, name, degree=None):
+        """
+          Measure the phase ``name`` in degree ``degree`` while the ``with`` block runs.
+        """
+        if self._memory:
+            self._fold_peak()
+            self._open_peaks.append(0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            record = self._phases.setdefault((name, degree), {"calls":0, "time":0.0, "peak_memory":None})
+            record["calls"] += 1
+            record["time"] += elapsed
+            data = {"name":name, "degree":degree, "time":elapsed}
+            if self._memory:
+                self._fold_peak()
+                peak = self._open_peaks.pop()
+                record["peak_memory"] = max(record["peak_memory"] or 0, peak)
+                data["peak_memory"] = peak
+            if self._callback is not None:
+                self._callback("phase", data)
+
+    def _fold_peak(self):
+        """
+          Add the peak of the traced memory since the last call to the open phases, and
+          start a new period.
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        self._open_peaks = [max(open_peak, peak) for open_peak in self._open_peaks]
+        self._peak_memory = max(self._peak_memory or 0, peak)
+        tracemalloc.reset_peak()
+
+    def record_matrix(self, name, degree, mat):
+        """
+          Record the shape and the number of nonzero entries of the matrix ``mat``.
+        """
+        data = {"name":name, "degree":degree, "shape":mat.dimensions(), "nnz":len(mat.dict())}
+        self._matrices.append(data)
+        if self._callback is not None:
+            self._callback("matrix", data)
+
+    def record_chains(self, p, count):
+        """
+          Record that there are ``count`` ``p``-chains.
+        """
+        self._chains[p] = count
+        if self._callback is not None:
+            self._callback("chains", {"degree":p, "count":count})
+
+    def as_dict(self):
+        """
+          Return the measurements as a JSON-serializable dictionary.
+        """
+        return {"phases":[dict(name=name, degree=degree, **record) for (name, degree), record in self._phases.items()],
+                "matrices":[dict(data, shape=list(data["shape"])) for data in self._matrices],
+                "chains":{str(p):count for p, count in self._chains.items()},
+                "peak_memory":self._peak_memory}
+
+    def __repr__(self):
+        lines = ["Profile report"]
+        for (name, degree), record in sorted(self._phases.items(), key=lambda item: (item[0][0], -1 if item[0][1] is None else item[0][1])):
+            phase = name if degree is None else "{} {}".format(name, degree)
+            line = "  {:<24} {:>6} calls {:>10.4f} s".format(phase, record["calls"], record["time"])
+            if record["peak_memory"] is not None:
+                line += " {:>12} B".format(record["peak_memory"])
+            lines.append(line)
+        return "\n".join(lines)
+
+_report = None
+_no_phase = nullcontext()
+
+@contextmanager
+def profiling(callback=None, memory=False):
+    """
+      Enable the instrumentation of the computations while the ``with`` block runs, and
+      yield the :class:`ProfileReport` that collects the measurements. While profiling is
+      disabled, the instrumented code only checks that no report is active.
+
+      Work done on a pool of processes is measured as a whole in this process. For
+      example, ``report.total_time("homology")`` is the time spent in the homology
+      computations within ``with profiling() as report:``.
+
+      INPUT:
+
+      - ``callback`` -- (default: ``None``); a function that is called for every
+        measurement, see :class:`ProfileReport`.
+
+      - ``memory`` -- (default: ``False``); whether to trace memory allocations.
+    """
+    global _report
+    previous = _report
+    report = ProfileReport(callback, memory)
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    _report = report
+    try:
+        with report.phase("total"):
+            yield report
+    finally:
+        _report = previous
+        if memory:
+            report._fold_peak()
+        if started_tracing:
+            tracemalloc.stop()
+
+def active_report():
+    """
+      Return the active :class:`ProfileReport`, or ``None`` if profiling is disabled.
+    """
+    return _report
+
+def profile_phase(name, degree=None):
+    """
+      Return a context manager that measures the phase ``name`` in degree ``degree`` if
+      profiling is enabled, and does nothing otherwise.
+    """
+    if _report is None:
+        return _no_phase
+    return _report.phase(name, degree)
@@ -0,0 +1,226 @@
+"""
+  Floating-Point Cochain Complexes, Hodge Laplacians and Harmonic Cochains of Sheaves.
+"""
+
+# imports
+import numpy
+
+try:
+    import scipy.sparse
+    import scipy.sparse.linalg
+except ImportError:
+    scipy = None
+
+from .instrument import profile_phase
+
+#-------------------------------------------------------------------------------
+# Hodge Laplacians with at most this many rows are diagonalized as dense matrices.
+DENSE_LIMIT = 1500
+
+# The stopping tolerance of the least-squares solver for harmonic projections.
+LSQR_TOLERANCE = 1e-12
+
+def _require_scipy():
+    if scipy is None:
+        raise ImportError("The numpy backend requires scipy")
+
+def _to_scipy(mat):
+    """
+      Return the Sage matrix ``mat`` as a ``scipy.sparse`` matrix of floats.
+    """
+    entries = mat.dict()
+    rows = numpy.fromiter((i for i, j in entries), dtype=numpy.int64, count=len(entries))
+    cols = numpy.fromiter((j for i, j in entries), dtype=numpy.int64, count=len(entries))
+    values = numpy.fromiter((float(value) for value in entries.values()), dtype=numpy.float64, count=len(entries))
+    return scipy.sparse.csr_matrix((values, (rows, cols)), shape=mat.dimensions())
+
+def _block_entries(mat):
+    """
+      Return the arrays of the rows, columns and values of the nonzero entries of the
+      Sage matrix ``mat``, as floats.
+    """
+    entries = mat.dict()
+    rows = numpy.array([i for i, j in entries], dtype=numpy.int64)
+    cols = numpy.array([j for i, j in entries], dtype=numpy.int64)
+    values = numpy.array([float(value) for value in entries.values()], dtype=numpy.float64)
+    return rows, cols, values
+
+def godement_differentials(sheaf, degrees):
+    """
+      Construct the differentials of the Godement cochain complex of ``sheaf`` from the
+      degrees ``p`` in ``degrees`` to ``p+1`` as ``scipy.sparse`` matrices of floats, in a
+      dictionary keyed by ``p``.
+
+      The coordinates are computed with array operations: the identity blocks of all
+      ``(p+1)``-chains at once for every face, and the restriction blocks at once for all
+      chains that end with the same pair of points.
+    """
+    _require_scipy()
+    index = sheaf._compact.index()
+    ranks = numpy.array(sheaf._compact.ranks(), dtype=numpy.int64)
+    differentials = dict()
+    for p in degrees:
+        with profile_phase("differential", p):
+            differentials[p] = _godement_differential(sheaf, p, index, ranks)
+    return differentials
+
+def _godement_differential(sheaf, p, index, ranks):
+    """
+      Construct the Godement differential of ``sheaf`` from degree ``p``, see
+      :func:`godement_differentials`.
+    """
+    compact = sheaf._compact
+    n = index.cardinality()
+    col_offsets = numpy.array(sheaf._chain_offsets(p), dtype=numpy.int64)
+    row_offsets = numpy.array(sheaf._chain_offsets(p + 1), dtype=numpy.int64)
+    chains = numpy.array(index.chain_array(p + 1), dtype=numpy.int64).reshape(-1, p + 2)
+    faces = numpy.array(index.face_array(p + 1), dtype=numpy.int64).reshape(-1, p + 2)
+    rows, cols, values = [], [], []
+    if len(chains):
+        # the identity blocks of the faces that keep the last point
+        sizes = ranks[chains[:, -1]]
+        chain_of = numpy.repeat(numpy.arange(len(chains)), sizes)
+        local = numpy.arange(len(chain_of)) - numpy.repeat(numpy.cumsum(sizes) - sizes, sizes)
+        for j in range(p + 1):
+            rows.append(row_offsets[chain_of] + local)
+            cols.append(col_offsets[faces[chain_of, j]] + local)
+            values.append(numpy.full(len(chain_of), 1.0 if j % 2 == 0 else -1.0))
+        # the restriction blocks, grouped by the last two points of the chains
+        sign = 1.0 if (p + 1) % 2 == 0 else -1.0
+        keys = chains[:, p]*n + chains[:, p + 1]
+        order = numpy.argsort(keys, kind="stable")
+        unique, starts = numpy.unique(keys[order], return_index=True)
+        stops = numpy.append(starts[1:], len(order))
+        for key, start, stop in zip(unique, starts, stops):
+            block_rows, block_cols, block_values = _block_entries(compact.restriction(int(key // n), int(key % n)))
+            members = order[start:stop]
+            rows.append((row_offsets[members][:, None] + block_rows[None, :]).ravel())
+            cols.append((col_offsets[faces[members, p + 1]][:, None] + block_cols[None, :]).ravel())
+            values.append(numpy.tile(sign*block_values, len(members)))
+    shape = (int(row_offsets[-1]), int(col_offsets[-1]))
+    if rows:
+        return scipy.sparse.csr_matrix((numpy.concatenate(values), (numpy.concatenate(rows), numpy.concatenate(cols))), shape=shape)
+    return scipy.sparse.csr_matrix(shape)
+
+def cochain_differentials(sheaf, method="godement", signs=None):
+    """
+      Return the differentials of the cochain complex of ``sheaf`` as ``scipy.sparse``
+      matrices of floats, in a dictionary keyed by the degree ``p >= 0`` of their domain.
+      ``method`` and ``signs`` are as for :meth:`LocallyFreeSheafFinitePoset.cohomology`.
+    """
+    _require_scipy()
+    if method == "godement":
+        return godement_differentials(sheaf, range(sheaf._compact.index().dimension() + 1))
+    if method == "cellular":
+        complex = sheaf.cellular_cochain_complex(signs)
+        return {p:_to_scipy(mat) for p, mat in complex.differential().items() if p >= 0}
+    raise ValueError("Unknown method {}".format(method))
+
+def numeric_rank(mat, tol=None):
+    """
+      Return the numerical rank of the sparse matrix ``mat``: its smaller dimension minus
+      the dimension of the kernel of the smaller of the sparse Gram matrices ``mat^T mat``
+      and ``mat mat^T``, which is computed with :func:`harmonic_cochains`. The singular
+      values of ``mat`` that are at most ``tol`` count as zero; if ``tol`` is ``None``, the
+      default eigenvalue tolerance of :func:`harmonic_cochains` is used for the Gram matrix.
+    """
+    _require_scipy()
+    if min(mat.shape) == 0 or mat.nnz == 0:
+        return 0
+    mat = scipy.sparse.csr_matrix(mat)
+    gram = mat.T @ mat if mat.shape[1] <= mat.shape[0] else mat @ mat.T
+    kernel = harmonic_cochains(scipy.sparse.csr_matrix(gram), None if tol is None else tol**2)
+    return min(mat.shape) - kernel.shape[1]
+
+def _term_rank(differentials, p):
+    if p in differentials:
+        return differentials[p].shape[1]
+    if p - 1 in differentials:
+        return differentials[p - 1].shape[0]
+    return 0
+
+def numeric_cohomology(differentials, degree=None, tol=None):
+    """
+      Return the dimensions of the cohomology of the cochain complex with the sparse
+      differentials ``differentials``, see :func:`cochain_differentials`: the dimension in
+      degree ``degree``, or a dictionary with the dimensions in the degrees of the nonzero
+      terms. The dimension in degree ``p`` is the number of harmonic cochains, the dimension
+      of the kernel of the sparse Hodge Laplacian, see :func:`hodge_laplacian` and
+      :func:`harmonic_cochains` with the eigenvalue tolerance ``tol``.
+    """
+    if degree is not None:
+        degrees = [degree]
+    else:
+        degrees = [p for p in sorted(differentials) if _term_rank(differentials, p) > 0]
+    dimensions = dict()
+    for p in degrees:
+        with profile_phase("homology", p):
+            dimensions[p] = harmonic_cochains(hodge_laplacian(differentials, p), tol).shape[1]
+    if degree is not None:
+        return dimensions[degree]
+    return dimensions
+
+def hodge_laplacian(differentials, p):
+    """
+      Return the Hodge Laplacian ``d_p^T d_p + d_{p-1} d_{p-1}^T`` in degree ``p`` of the
+      cochain complex with the sparse differentials ``differentials``, as a sparse matrix.
+    """
+    _require_scipy()
+    n = _term_rank(differentials, p)
+    laplacian = scipy.sparse.csr_matrix((n, n))
+    if p in differentials:
+        laplacian = laplacian + differentials[p].T @ differentials[p]
+    if p - 1 in differentials:
+        laplacian = laplacian + differentials[p - 1] @ differentials[p - 1].T
+    return scipy.sparse.csr_matrix(laplacian)
+
+def harmonic_cochains(laplacian, tol=None):
+    """
+      Return an orthonormal basis of the kernel of the Hodge Laplacian ``laplacian``, the
+      harmonic cochains, as the columns of an array. These are the eigenvectors with
+      eigenvalues at most ``tol``; if ``tol`` is ``None``, it is the size of the matrix times
+      the machine epsilon times the largest absolute row sum.
+
+      Laplacians with at most ``DENSE_LIMIT`` rows are diagonalized as dense matrices. For
+      larger ones, the smallest eigenvalues are computed with ``scipy.sparse.linalg.eigsh``
+      in shift-invert mode, doubling their number until one exceeds the tolerance, and the
+      dense matrix is diagonalized if none does among half of them.
+    """
+    _require_scipy()
+    n = laplacian.shape[0]
+    if n == 0:
+        return numpy.zeros((0, 0))
+    scale = max(abs(laplacian).sum(axis=1).max(), 1.0)
+    if tol is None:
+        tol = n*numpy.finfo(numpy.float64).eps*scale
+    if n > DENSE_LIMIT:
+        k = 8
+        while 2*k <= n:
+            # a small negative shift keeps the shifted matrix invertible and separates the
+            # kernel from the small positive eigenvalues
+            try:
+                eigenvalues, eigenvectors = scipy.sparse.linalg.eigsh(laplacian, k=k, sigma=-1e-3*scale, which="LM", ncv=min(n, 4*k))
+            except scipy.sparse.linalg.ArpackNoConvergence:
+                eigenvalues = numpy.zeros(0)
+            if (eigenvalues > tol).any():
+                return eigenvectors[:, eigenvalues <= tol]
+            k = 2*k
+    eigenvalues, eigenvectors = numpy.linalg.eigh(laplacian.toarray())
+    return eigenvectors[:, eigenvalues <= tol]
+
+def harmonic_projection(differentials, p, cochain):
+    """
+      Return the harmonic part of the cochain ``cochain`` in degree ``p``: the cochain
+      minus its components in the image of ``d_{p-1}`` and in the image of ``d_p^T``, which
+      are computed one after the other by sparse least squares with ``scipy.sparse.linalg.lsqr``.
+      The harmonic part represents the cohomology class of ``cochain`` if it is a cocycle.
+    """
+    _require_scipy()
+    harmonic = numpy.array(cochain, dtype=numpy.float64)
+    if p - 1 in differentials and differentials[p - 1].shape[1] > 0:
+        d = differentials[p - 1]
+        harmonic = harmonic - d @ scipy.sparse.linalg.lsqr(d, harmonic, atol=LSQR_TOLERANCE, btol=LSQR_TOLERANCE)[0]
+    if p in differentials and differentials[p].shape[0] > 0:
+        d = differentials[p].T.tocsr()
+        harmonic = harmonic - d @ scipy.sparse.linalg.lsqr(d, harmonic, atol=LSQR_TOLERANCE, btol=LSQR_TOLERANCE)[0]
+    return harmonic
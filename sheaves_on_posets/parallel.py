@@ -0,0 +1,40 @@
+"""
+  Running Independent Tasks on a Process Pool.
+"""
+
+# imports
+from multiprocessing import Pool
+
+#-------------------------------------------------------------------------------
+# Rows of a differential that are built in one task, at least. Smaller degrees
+# are built in a single task.
+MIN_SLAB_ROWS = 1000
+
+def slabs(length, workers=None):
+    """
+      Split ``range(length)`` into consecutive ranges ``(start, stop)``, one for every
+      task that builds a part of a differential with ``length`` block rows.
+    """
+    if workers is None or workers <= 1 or length <= MIN_SLAB_ROWS:
+        return [(0, length)]
+    size = max(MIN_SLAB_ROWS, -(-length // workers))
+    return [(start, min(start + size, length)) for start in range(0, length, size)]
+
+def pool_map(function, tasks, workers=None):
+    """
+      Apply ``function`` to every task in ``tasks`` and return the list of results,
+      in the order of the tasks.
+
+      If ``workers`` is an integer larger than 1, the tasks are distributed over a pool
+      of that many processes. ``function`` must then be a module level function, and the
+      tasks and results must be picklable. Otherwise, the tasks are run in this process.
+    """
+    tasks = list(tasks)
+    if workers is None or workers <= 1 or len(tasks) <= 1:
+        return [function(task) for task in tasks]
+    pool = Pool(min(workers, len(tasks)))
+    try:
+        return pool.map(function, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
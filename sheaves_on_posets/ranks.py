@@ -0,0 +1,64 @@
+"""
+  Ranks of Sparse Matrices and Betti Numbers of Cochain Complexes.
+"""
+
+# imports
+from sage.rings.integer_ring import ZZ
+from sage.rings.finite_rings.finite_field_constructor import GF
+
+from .parallel import pool_map
+
+#-------------------------------------------------------------------------------
+DEFAULT_PRIMES = (2, 3, 32003, 32749)
+
+def matrix_rank(mat, primes=None):
+    """
+      Return the rank of the matrix ``mat``.
+
+      Over a field, the rank is computed by elimination over that field, which is
+      sparse for sparse matrices. Over the integers, the ranks modulo the given primes are
+      computed first. Each of them is a lower bound for the rank, which drops modulo the
+      primes that divide the torsion of the cokernel, so their maximum is the rank if it
+      is as large as the smaller dimension of ``mat``. Only otherwise the exact rank over
+      the integers is computed.
+
+      INPUT:
+
+      - ``mat`` -- a matrix over a field or over the integers.
+
+      - ``primes`` -- (default: ``None``); the primes used over the integers. If ``None``,
+          ``DEFAULT_PRIMES`` is used.
+    """
+    if mat.nrows() == 0 or mat.ncols() == 0:
+        return 0
+    base_ring = mat.base_ring()
+    if base_ring != ZZ:
+        return mat.rank()
+    if primes is None:
+        primes = DEFAULT_PRIMES
+    modular_rank = max(mat.change_ring(GF(p)).rank() for p in primes)
+    if modular_rank == min(mat.nrows(), mat.ncols()):
+        return modular_rank
+    return mat.rank()
+
+def _matrix_rank_task(task):
+    """
+      Return ``matrix_rank(*task)``. 
+    """
+    return matrix_rank(*task)
+
+def betti_numbers(cochain_complex, degrees, primes=None, workers=None):
+    """
+      Return the Betti numbers of the cochain complex ``cochain_complex`` in the given
+      degrees, as a dictionary.
+
+      Over a field, the Betti number in degree ``p`` is the dimension of the cohomology;
+      over the integers it is the rank of the free part of the cohomology. Both are computed as
+      the rank of the term in degree ``p`` minus the ranks of the differentials out of and
+      into degree ``p``, see :func:`matrix_rank`. Every differential is reduced only once;
+      if ``workers`` is given, the differentials are reduced on a pool of that many processes.
+    """
+    needed = sorted(set(degrees) | set(p - 1 for p in degrees))
+    tasks = [(cochain_complex.differential(p), primes) for p in needed]
+    ranks = dict(zip(needed, pool_map(_matrix_rank_task, tasks, workers)))
+    return {p:cochain_complex.free_module_rank(p) - ranks[p] - ranks[p - 1] for p in degrees}
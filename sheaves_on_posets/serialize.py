@@ -0,0 +1,269 @@
+"""
+  Binary Serialization of Sheaves and Complexes of Sheaves.
+"""
+
+# imports
+import json
+import struct
+
+import numpy
+
+from sage.combinat.posets.posets import Poset
+from sage.rings.integer import Integer
+
+from .chain_index import chain_index
+from .codec import ring_code, ring_from_code, matrices_to_arrays, arrays_to_matrices
+from .sheaf import LocallyFreeSheafFinitePoset
+from .sheaf_complex import LocFreeSheafComplex
+
+#-------------------------------------------------------------------------------
+# A file is the magic string and the format version, followed by records. Every record
+# is a record type, a JSON header and the int64 arrays named in the header.
+MAGIC = b"SOPSHEAF"
+VERSION = 1
+
+POSET_RECORD = b"P"
+SHEAF_RECORD = b"S"
+COMPLEX_RECORD = b"C"
+DIFFERENTIAL_RECORD = b"D"
+
+def _encode_label(label):
+    """
+      Return the JSON value of the point ``label``. Integers, strings and tuples of
+      those are supported.
+    """
+    if isinstance(label, (int, Integer)) and not isinstance(label, bool):
+        return int(label)
+    if isinstance(label, str):
+        return label
+    if isinstance(label, tuple):
+        return {"tuple":[_encode_label(part) for part in label]}
+    raise ValueError("Points of type {} cannot be serialized".format(type(label).__name__))
+
+def _decode_label(value):
+    """
+      Return the point encoded as ``value``, see :func:`_encode_label`.
+    """
+    if isinstance(value, dict):
+        return tuple(_decode_label(part) for part in value["tuple"])
+    return value
+
+class SheafWriter(object):
+    """
+      Write sheaves and complexes of sheaves to a binary file, one after the other.
+
+      The poset of a sheaf is written once per file, as its points and the arrays of the
+      point numbers of its cover relations; the sheaf itself is its base ring, the array of
+      its stalk ranks and the restriction matrices along the cover relations as concatenated
+      sparse coordinate arrays, see :func:`matrices_to_arrays`. The base ring must be ``ZZ``,
+      ``QQ`` or a prime field and the entries must fit in 64 bits.
+
+      INPUT:
+
+      - ``filename`` -- the name of the file, which is overwritten.
+    """
+    def __init__(self, filename):
+        """
+          Constructor of :class:`SheafWriter`
+        """
+        self._file = open(filename, "wb")
+        self._file.write(MAGIC + struct.pack("<I", VERSION))
+        self._poset_ids = dict()
+
+    def _write_record(self, record_type, header, arrays):
+        header = dict(header)
+        header["arrays"] = sorted(arrays)
+        encoded = json.dumps(header).encode()
+        self._file.write(record_type + struct.pack("<I", len(encoded)) + encoded)
+        for name in header["arrays"]:
+            data = numpy.ascontiguousarray(arrays[name], dtype="<i8")
+            self._file.write(struct.pack("<Q", len(data)))
+            self._file.write(data.tobytes())
+
+    def _write_poset(self, poset):
+        """
+          Write ``poset`` if it was not written before, and return its id in the file.
+        """
+        if poset in self._poset_ids:
+            return self._poset_ids[poset]
+        poset_id = len(self._poset_ids)
+        index = chain_index(poset)
+        covers = list(index.cover_relations())
+        labels = [_encode_label(point) for point in index.points()]
+        arrays = {"lower":[i for i, j in covers], "upper":[j for i, j in covers]}
+        self._write_record(POSET_RECORD, {"id":poset_id, "points":labels}, arrays)
+        self._poset_ids[poset] = poset_id
+        return poset_id
+
+    def _matrix_arrays(self, matrices, base_ring):
+        arrays = matrices_to_arrays(matrices, base_ring)
+        if arrays is None:
+            raise ValueError("The entries of the matrices do not fit in 64 bits")
+        return arrays
+
+    def _write_sheaf(self, sheaf):
+        code = ring_code(sheaf._base_ring)
+        if code is None:
+            raise ValueError("Sheaves over {} cannot be serialized".format(sheaf._base_ring))
+        poset_id = self._write_poset(sheaf._domain_poset)
+        compact = sheaf._compact
+        blocks = [compact.cover_block(e) for e in range(compact.index().ncovers())]
+        arrays = self._matrix_arrays(blocks, sheaf._base_ring)
+        arrays["ranks"] = compact.ranks()
+        self._write_record(SHEAF_RECORD, {"poset":poset_id, "ring":code}, arrays)
+
+    def _write_complex(self, complex):
+        places = list(range(complex.below_bound(), complex.above_bound() + 1))
+        self._write_record(COMPLEX_RECORD, {"min":complex.below_bound(), "terms":len(places), "name":complex._name}, dict())
+        for place in places:
+            if place != places[0]:
+                matrices = complex.differential(place - 1)._component_matrices()
+                header = {"poset":self._poset_ids[complex._domain_poset], "shapes":[list(mat.dimensions()) for mat in matrices]}
+                self._write_record(DIFFERENTIAL_RECORD, header, self._matrix_arrays(matrices, complex._base_ring))
+            self._write_sheaf(complex.sheaf_at(place))
+
+    def write(self, obj):
+        """
+          Write ``obj``, a sheaf or a complex of sheaves.
+        """
+        if isinstance(obj, LocallyFreeSheafFinitePoset):
+            self._write_sheaf(obj)
+        elif isinstance(obj, LocFreeSheafComplex):
+            self._write_complex(obj)
+        else:
+            raise TypeError("Only sheaves and complexes of sheaves can be serialized")
+
+    def close(self):
+        """
+          Close the file.
+        """
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class _SheafReader(object):
+    """
+      Read the sheaves and complexes of sheaves in the binary stream ``stream``, written
+      by :class:`SheafWriter`, one after the other.
+    """
+    def __init__(self, stream, check=True):
+        """
+          Constructor of :class:`_SheafReader`
+        """
+        self._stream = stream
+        self._check = check
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError("The file is not a file of sheaves")
+        version = struct.unpack("<I", self._read_bytes(4))[0]
+        if version > VERSION:
+            raise ValueError("The file has format version {}, but only versions up to {} are supported".format(version, VERSION))
+        self._posets = dict()
+
+    def _read_bytes(self, n):
+        data = self._stream.read(n)
+        if len(data) != n:
+            raise ValueError("The file of sheaves is truncated")
+        return data
+
+    def _read_record(self):
+        """
+          Return the next record other than a poset as the triple ``(record_type, header, arrays)``,
+          or ``None`` at the end of the file. Posets are read and kept on the way.
+        """
+        while True:
+            record_type = self._stream.read(1)
+            if not record_type:
+                return None
+            length = struct.unpack("<I", self._read_bytes(4))[0]
+            header = json.loads(self._read_bytes(length).decode())
+            arrays = dict()
+            for name in header["arrays"]:
+                count = struct.unpack("<Q", self._read_bytes(8))[0]
+                arrays[name] = numpy.frombuffer(self._read_bytes(8*count), dtype="<i8")
+            if record_type != POSET_RECORD:
+                return record_type, header, arrays
+            self._read_poset(header, arrays)
+
+    def _expect(self, record_type):
+        record = self._read_record()
+        if record is None or record[0] != record_type:
+            raise ValueError("The file of sheaves is truncated or corrupt")
+        return record[1], record[2]
+
+    def _read_poset(self, header, arrays):
+        points = [_decode_label(label) for label in header["points"]]
+        covers = [(points[i], points[j]) for i, j in zip(arrays["lower"], arrays["upper"])]
+        self._posets[header["id"]] = (points, covers, Poset((points, covers), cover_relations=True))
+
+    def _read_sheaf(self, header, arrays):
+        points, covers, poset = self._posets[header["poset"]]
+        base_ring = ring_from_code(header["ring"])
+        rank = dict(zip(points, [int(r) for r in arrays["ranks"]]))
+        blocks = arrays_to_matrices(arrays, [(rank[b], rank[a]) for a, b in covers], base_ring)
+        return LocallyFreeSheafFinitePoset(rank, dict(zip(covers, blocks)), base_ring, poset)
+
+    def _read_complex(self, header):
+        data = [header["min"]]
+        for term in range(header["terms"]):
+            if term > 0:
+                diff_header, arrays = self._expect(DIFFERENTIAL_RECORD)
+                points = self._posets[diff_header["poset"]][0]
+                components = arrays_to_matrices(arrays, diff_header["shapes"], data[-1]._base_ring)
+                data.append(dict(zip(points, components)))
+            data.append(self._read_sheaf(*self._expect(SHEAF_RECORD)))
+        return LocFreeSheafComplex(data, name=header["name"], check=self._check)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        record = self._read_record()
+        if record is None:
+            raise StopIteration
+        record_type, header, arrays = record
+        if record_type == SHEAF_RECORD:
+            return self._read_sheaf(header, arrays)
+        if record_type == COMPLEX_RECORD:
+            return self._read_complex(header)
+        raise ValueError("The file of sheaves is truncated or corrupt")
+
+def save_sheaves(objects, filename):
+    """
+      Write the sheaves and complexes of sheaves in the iterable ``objects`` to the file
+      ``filename``, see :class:`SheafWriter`.
+    """
+    with SheafWriter(filename) as writer:
+        for obj in objects:
+            writer.write(obj)
+
+def iter_sheaves(filename, check=True):
+    """
+      Iterate over the sheaves and complexes of sheaves in the file ``filename``, written by
+      :class:`SheafWriter` or :func:`save_sheaves`. Only one object is held in memory at a time.
+
+      The posets are rebuilt from their points and cover relations, once per file, so all
+      objects read from one file share their posets. A rebuilt poset is a plain poset with
+      the same points and cover relations as the original, but it need not compare equal to
+      it, for instance if the original was a lattice.
+
+      INPUT:
+
+      - ``filename`` -- the name of the file.
+
+      - ``check`` -- (default: ``True``); whether to check that the differentials of
+        complexes are morphisms of sheaves that compose to zero.
+    """
+    with open(filename, "rb") as stream:
+        for obj in _SheafReader(stream, check):
+            yield obj
+
+def load_sheaves(filename, check=True):
+    """
+      Return the list of the sheaves and complexes of sheaves in the file ``filename``,
+      see :func:`iter_sheaves`.
+    """
+    return list(iter_sheaves(filename, check))
@@ -0,0 +1,311 @@
+"""
+  Editing Sheaves with Incremental Recomputation of their Cohomology.
+"""
+
+# imports
+from sage.matrix.special import identity_matrix
+from sage.matrix.constructor import matrix
+from sage.homology.chain_complex import ChainComplex
+
+from .compact import CompactSheaf
+from .sheaf import LocallyFreeSheafFinitePoset
+from .batch import _GodementPattern
+from .instrument import profile_phase
+
+#-------------------------------------------------------------------------------
+class SheafSession(object):
+    """
+      A mutable copy of a sheaf, whose stalk ranks and restriction maps can be changed
+      one at a time, with the cohomology recomputed only where the changes require it.
+
+      The session keeps the table of all restriction matrices, the entries of the
+      Godement differentials and the cohomology in every degree. When the restriction map
+      along a cover relation ``a < b`` changes, only the restrictions from points ``x <= a``
+      to points ``y >= b`` are composed again, and functoriality is checked only on these
+      intervals. In the Godement differentials, only the blocks of the chains that end
+      with one of these pairs are rewritten, only the differentials that contain such a
+      block are assembled again, and the cohomology is only recomputed in the degrees next
+      to them. A change of a stalk rank moves the blocks of the Godement complex, so then
+      the differentials are all rebuilt, but the restriction table is still updated locally.
+
+      An edit that makes the restriction maps non-functorial is undone, and a ``ValueError``
+      is raised.
+
+      INPUT:
+
+      - ``sheaf`` -- an instance of :class:`LocallyFreeSheafFinitePoset`, which is not changed.
+    """
+    def __init__(self, sheaf):
+        """
+          Constructor of :class:`SheafSession`
+        """
+        compact = sheaf._compact
+        self._index = compact.index()
+        self._base_ring = sheaf._base_ring
+        self._domain_poset = sheaf._domain_poset
+        self._ranks = list(compact.ranks())
+        self._blocks = [compact.cover_block(e) for e in range(self._index.ncovers())]
+        n = self._index.cardinality()
+        self._table = {(i, j):compact.restriction(i, j) for i in range(n) for j in [i] + list(self._index.points_above(i))}
+        self._degrees = list(range(self._index.dimension() + 1))
+        self._pattern = None
+        self._homology = dict()
+
+    def base_ring(self):
+        """
+          Return the base ring.
+        """
+        return self._base_ring
+
+    def domain_poset(self):
+        """
+          Return the poset on which the sheaf is defined.
+        """
+        return self._domain_poset
+
+    def stalk_rank(self, x):
+        """
+          Return the rank of the stalk at the point ``x``.
+        """
+        return self._ranks[self._index.point_index(x)]
+
+    def restriction_matrix(self, x, y):
+        """
+          Return the matrix of the restriction map from the point ``x`` to the point ``y >= x``.
+        """
+        index = self._index
+        i, j = index.point_index(x), index.point_index(y)
+        if not index.is_lequal(i, j):
+            raise ValueError("{} is not a specialization of {}".format(x, y))
+        return self._table[(i, j)]
+
+    def _block(self, i, j, value):
+        """
+          Return the immutable matrix of the restriction map from the point with number ``i``
+          to its upper cover ``j``, given as for :class:`LocallyFreeSheafFinitePoset`.
+        """
+        if value is None or value == 0:
+            block = matrix(self._base_ring, self._ranks[j], self._ranks[i], sparse=True)
+        elif value == 1:
+            block = identity_matrix(self._base_ring, self._ranks[i], sparse=True)
+        else:
+            block = matrix(self._base_ring, value, sparse=True)
+        if block.dimensions() != (self._ranks[j], self._ranks[i]):
+            raise ValueError("The restriction map from {} to {} must be a {} by {} matrix".format(self._index.point(i), self._index.point(j), self._ranks[j], self._ranks[i]))
+        block.set_immutable()
+        return block
+
+    def _affected_pairs(self, edges):
+        """
+          Return the set of the pairs ``(i, j)`` of point numbers whose restriction factors
+          through one of the cover edges ``edges``.
+        """
+        index = self._index
+        pairs = set()
+        for e in edges:
+            a, b = index.cover_source(e), index.cover_target(e)
+            below = [a] + list(index.points_below(a))
+            above = [b] + list(index.points_above(b))
+            pairs.update((i, j) for i in below for j in above)
+        return pairs
+
+    def _compose(self, pairs):
+        """
+          Compose the restriction matrices of the pairs ``pairs`` again, along the same paths
+          as :meth:`CompactSheaf.restriction`: from ``i`` to its first upper cover ``c <= j``,
+          and from ``c`` to ``j``.
+        """
+        index = self._index
+        for i, j in sorted(pairs, reverse=True):
+            if i == j:
+                mat = identity_matrix(self._base_ring, self._ranks[i])
+            else:
+                for e in index.cover_edges(i):
+                    c = index.cover_target(e)
+                    if index.is_lequal(c, j):
+                        break
+                mat = self._blocks[e] if c == j else self._table[(c, j)]*self._blocks[e]
+            mat.set_immutable()
+            self._table[(i, j)] = mat
+
+    def _violation(self, pairs):
+        """
+          Return the first pair ``(i, j)`` in ``pairs`` for which the restriction from ``i``
+          to ``j`` does not factor through every upper cover ``c <= j`` of ``i``, or ``None``.
+        """
+        index = self._index
+        for i, j in sorted(pairs):
+            for e in index.cover_edges(i):
+                c = index.cover_target(e)
+                if index.is_lequal(c, j) and self._table[(c, j)]*self._blocks[e] != self._table[(i, j)]:
+                    return (i, j)
+        return None
+
+    def _apply(self, blocks, ranks, check):
+        """
+          Replace the cover blocks and stalk ranks given by the dictionaries ``blocks``, keyed
+          by cover edge, and ``ranks``, keyed by point number, and update the restriction table.
+          The edit is undone if ``check`` is ``True`` and the result is not functorial.
+
+          OUTPUT:
+
+          The set of the pairs of point numbers whose restriction matrix may have changed.
+        """
+        index = self._index
+        pairs = self._affected_pairs(blocks)
+        pairs.update((i, i) for i in ranks)
+        old_blocks = {e:self._blocks[e] for e in blocks}
+        old_ranks = {i:self._ranks[i] for i in ranks}
+        old_table = {pair:self._table[pair] for pair in pairs}
+        for e, block in blocks.items():
+            self._blocks[e] = block
+        for i, rank in ranks.items():
+            self._ranks[i] = rank
+        with profile_phase("restriction_table"):
+            self._compose(pairs)
+        if check:
+            with profile_phase("validation"):
+                violation = self._violation(pairs)
+            if violation is not None:
+                for e, block in old_blocks.items():
+                    self._blocks[e] = block
+                for i, rank in old_ranks.items():
+                    self._ranks[i] = rank
+                self._table.update(old_table)
+                raise ValueError("The sheaf data is not valid: the restriction maps from {} to {} are not compatible".format(*index.chain_points(violation)))
+        if ranks:
+            self._pattern = None
+            self._homology = dict()
+        elif self._pattern is not None:
+            self._update_differentials(pairs, old_table)
+        return pairs
+
+    def set_restriction(self, a, b, mat, check=True):
+        """
+          Set the restriction map from the point ``a`` to its upper cover ``b`` to the matrix
+          ``mat``, or to the zero or identity map if ``mat`` is ``0`` or ``1``. If ``check`` is
+          ``True``, functoriality is checked on the intervals from the points below ``a``
+          to the points above ``b``.
+        """
+        self.set_restrictions({(a, b):mat}, check)
+
+    def set_restrictions(self, res_dict, check=True):
+        """
+          Set the restriction maps along the cover relations in the dictionary ``res_dict``,
+          as in :meth:`set_restriction`, and check functoriality once for all of them.
+        """
+        index = self._index
+        blocks = dict()
+        for (a, b), value in res_dict.items():
+            i, j = index.point_index(a), index.point_index(b)
+            blocks[index.cover_edge(i, j)] = self._block(i, j, value)
+        self._apply(blocks, dict(), check)
+
+    def set_stalk_rank(self, x, rank, restrictions=None, check=True):
+        """
+          Set the rank of the stalk at the point ``x`` to ``rank``.
+
+          The restriction maps along the cover relations from and to ``x`` are given by the
+          dictionary ``restrictions``, keyed by cover relations, as in :meth:`set_restriction`;
+          the ones that are not given become zero maps.
+        """
+        index = self._index
+        k = index.point_index(x)
+        restrictions = dict() if restrictions is None else restrictions
+        old_rank = self._ranks[k]
+        self._ranks[k] = rank
+        try:
+            edges = list(index.cover_edges(k)) + [e for e in range(index.ncovers()) if index.cover_target(e) == k]
+            blocks = dict()
+            for e in edges:
+                i, j = index.cover_source(e), index.cover_target(e)
+                blocks[e] = self._block(i, j, restrictions.get((index.point(i), index.point(j))))
+        finally:
+            self._ranks[k] = old_rank
+        self._apply(blocks, {k:rank}, check)
+
+    def sheaf(self):
+        """
+          Return the sheaf with the current data of ``self``, as an instance of
+          :class:`LocallyFreeSheafFinitePoset`. Later edits of ``self`` do not change it.
+        """
+        compact = CompactSheaf(self._index, self._base_ring, self._ranks, list(self._blocks))
+        compact._table = dict(self._table)
+        return LocallyFreeSheafFinitePoset(compact.stalk_dict(), compact.res_dict(), self._base_ring, self._domain_poset, compact)
+
+    def _build_differentials(self):
+        """
+          Build the Godement differentials from scratch, keeping their entries, the positions
+          of the restriction blocks in them, keyed by pair of point numbers, and the matrices.
+        """
+        sheaf = self.sheaf()
+        self._pattern = _GodementPattern(sheaf, self._degrees)
+        self._entries = dict()
+        self._slots = dict()
+        self._differentials = dict()
+        for p in self._degrees:
+            with profile_phase("differential", p):
+                entries = dict(self._pattern._identity_entries[p])
+                sign, slots = self._pattern._slots[p]
+                for row, col, pair in slots:
+                    self._slots.setdefault(pair, []).append((p, row, col))
+                    for (a, b), value in self._table[pair].dict().items():
+                        entries[(row + a, col + b)] = sign*value
+                self._entries[p] = entries
+                self._differentials[p] = self._assemble(p)
+
+    def _assemble(self, p):
+        nrows, ncols = self._pattern._shapes[p]
+        return matrix(self._base_ring, nrows, ncols, self._entries[p], sparse=True)
+
+    def _update_differentials(self, pairs, old_table):
+        """
+          Rewrite the restriction blocks of the pairs ``pairs`` in the Godement differentials,
+          assemble the differentials that changed again and drop the cohomology next to them.
+        """
+        changed = set()
+        for pair in pairs:
+            old, new = old_table[pair].dict(), self._table[pair].dict()
+            if old == new:
+                continue
+            for p, row, col in self._slots.get(pair, []):
+                sign = self._pattern._slots[p][0]
+                entries = self._entries[p]
+                for a, b in old:
+                    del entries[(row + a, col + b)]
+                for (a, b), value in new.items():
+                    entries[(row + a, col + b)] = sign*value
+                changed.add(p)
+        for p in changed:
+            with profile_phase("differential", p):
+                self._differentials[p] = self._assemble(p)
+            self._homology.pop(p, None)
+            self._homology.pop(p + 1, None)
+
+    def godement_cochain_complex(self):
+        """
+          Return the Godement cochain complex of the current sheaf.
+        """
+        if self._pattern is None:
+            self._build_differentials()
+        return ChainComplex(dict(self._differentials), base_ring=self._base_ring)
+
+    def cohomology(self, degree=None):
+        """
+          Return the cohomology of the current sheaf, in degree ``degree`` or, if ``degree``
+          is ``None``, in all degrees, as :meth:`LocallyFreeSheafFinitePoset.cohomology` does.
+          The cohomology is only recomputed in the degrees that are affected by the edits
+          since it was last computed.
+        """
+        complex = self.godement_cochain_complex()
+        degrees = complex.nonzero_degrees() if degree is None else [degree]
+        for p in degrees:
+            if p not in self._homology:
+                with profile_phase("homology", p):
+                    self._homology[p] = complex.homology(p)
+        if degree is not None:
+            return self._homology[degree]
+        return {p:self._homology[p] for p in degrees}
+
+    def __repr__(self):
+        return "Editing session of a locally free sheaf over {} with stalk ranks {}".format(self._base_ring, self._ranks)
@@ -5,26 +5,97 @@
 # imports 
 from sage.structure.category_object import CategoryObject
 from sage.categories.homset import Hom
-from sage.matrix.special import identity_matrix
-from sage.matrix.special import block_matrix, block_diagonal_matrix
-from sage.matrix.constructor import Matrix, matrix
+from sage.matrix.constructor import matrix
 from sage.homology.chain_complex import ChainComplex
+from sage.homology.homology_group import HomologyGroup
+from sage.modules.free_module import FreeModule
+from sage.modules.free_module_element import vector
 from sage.rings.integer_ring import ZZ
 from sage.combinat.posets.posets import Poset
 from sage.tensor.modules.finite_rank_free_module import FiniteRankFreeModule
 
 from .sheaf_homset import LocFreeSheafHomset
+from .chain_index import chain_index, _bits
+from .compact import CompactSheaf, compact_sheaf, summand_offsets
+from .cache import LRUCache, MODULE_CACHE_SIZE, persistent_cache
+from .morse import morse_reduction
+from .ranks import betti_numbers
+from .parallel import pool_map, slabs
+from .cellular import _cell_dimensions, _incidence_signs, _check_incidence_signs
+from .instrument import active_report, profile_phase
+from .numeric import godement_differentials, cochain_differentials, numeric_cohomology, hodge_laplacian, harmonic_cochains, harmonic_projection
 
 #-------------------------------------------------------------------------------
-def _composition_free_module_morphism(psi, phi):
+def _godement_differential_rows(task):
     """
-      Returns the composition of two compasable morphisms of free modules of 
-      finite rank over the same base ring.
-    """    
-    hom = Hom(phi.domain(), psi.codomain())
-    if phi.is_zero() or psi.is_zero():
-        return hom.zero()
-    return hom(psi.matrix() * phi.matrix())
+      Returns the entries of a range of block rows of the Godement differential 
+      from degree ``p`` to degree ``p+1``, as a dictionary. 
+      
+      The task is a tuple ``(p, chains, faces, row_offsets, col_offsets, restrictions)``:
+      the flat arrays of the ``(p+1)``-chains of the range and of the positions of their 
+      faces, the offsets of their rows followed by the end of the range, the offsets 
+      of all ``p``-chains, and the matrices of the restrictions between the last two points 
+      of these chains, keyed by point numbers. 
+    """
+    p, chains, faces, row_offsets, col_offsets, restrictions = task
+    entries = dict()
+    for k in range(len(row_offsets) - 1):
+        row = row_offsets[k]
+        m = row_offsets[k + 1] - row
+        for j in range(p + 2):
+            col = col_offsets[faces[k*(p+2) + j]]
+            sign = 1 if j % 2 == 0 else - 1
+            if j != p + 1:
+                for l in range(m):
+                    entries[(row + l, col + l)] = sign
+            else:
+                mat = restrictions[(chains[k*(p+2) + p], chains[k*(p+2) + p + 1])]
+                for (a, b), value in mat.dict().items():
+                    entries[(row + a, col + b)] = sign*value
+    return entries
+
+def _homology_in_degree(task):
+    """
+      Returns the homology in degree ``p`` of the cochain complex with the 
+      differentials ``d_in`` into and ``d_out`` out of degree ``p``, where 
+      ``task`` is the tuple ``(p, d_in, d_out, base_ring)``. 
+    """
+    p, d_in, d_out, base_ring = task
+    return ChainComplex({p - 1:d_in, p:d_out}, base_ring=base_ring).homology(p)
+
+def _cohomology_data(cohomology):
+    """
+      Return the JSON-serializable description of ``cohomology``, a module as returned by 
+      ``ChainComplex.homology`` or a dictionary of them keyed by degree. 
+    """
+    if isinstance(cohomology, dict):
+        return {str(p):_cohomology_data(group) for p, group in cohomology.items()}
+    if hasattr(cohomology, "invariants"):
+        return {"invariants":[int(a) for a in cohomology.invariants()]}
+    return {"dimension":int(cohomology.dimension())}
+
+def _cohomology_from_data(data, base_ring):
+    """
+      Return the cohomology described by ``data``, see :func:`_cohomology_data`. 
+    """
+    if "invariants" in data:
+        return HomologyGroup(len(data["invariants"]), base_ring, data["invariants"])
+    if "dimension" in data:
+        return FreeModule(base_ring, data["dimension"])
+    return {int(p):_cohomology_from_data(group, base_ring) for p, group in data.items()}
+
+def _quotient_basis(kernel, image):
+    """
+      Return a basis of the quotient ``kernel/image`` of free modules, lifted to ``kernel``, 
+      and the function that maps an element of ``kernel`` to the coordinates of its class
+      in this basis. Raise a ``ValueError`` if the quotient is not free. 
+    """
+    quotient = kernel/image
+    if kernel.base_ring().is_field():
+        return [quotient.lift(g) for g in quotient.gens()], lambda v, projection=quotient.quotient_map(): list(projection(v))
+    if any(quotient.invariants()):
+        raise ValueError("The cohomology has torsion {}, so it is not locally free".format([a for a in quotient.invariants() if a]))
+    return [g.lift() for g in quotient.gens()], lambda v: list(quotient(v).vector())
 
 def ConstantSheaf(domain_poset, base_ring = ZZ, rank=1):
     stalk_dict = {x:rank for x in domain_poset.list()}
@@ -34,7 +105,31 @@ def ConstantSheaf(domain_poset, base_ring = ZZ, rank=1):
 def ZeroSheaf(domain_poset, base_ring = ZZ):
     return ConstantSheaf(domain_poset, base_ring, rank = 0)
     
-def LocFreeSheaf(stalk_dict = {}, res_dict = {}, base_ring = ZZ, domain_poset = None):
+def direct_sum(*sheaves):
+    """
+      Construct the direct sum of ``sheaves``, which must be defined on the same poset 
+      and over the same ring. 
+      
+      The offsets of the summands in the stalks of the sum are computed once, and every 
+      cover restriction is assembled as a single sparse block diagonal matrix. The offsets 
+      are kept on the result, which gives the injections and projections of the summands, 
+      see :meth:`LocallyFreeSheafFinitePoset.injection` and 
+      :meth:`LocallyFreeSheafFinitePoset.projection`. 
+    """
+    if not sheaves:
+        raise ValueError("The direct sum of no sheaves is not defined on a poset")
+    first = sheaves[0]
+    for sheaf in sheaves[1:]:
+        if not (first._base_ring == sheaf._base_ring and first._domain_poset == sheaf._domain_poset):
+            raise TypeError("Sheaves are not defined on same poset or not defined over same ring")
+    compacts = [sheaf._compact for sheaf in sheaves]
+    compact = compacts[0].direct_sum(*compacts[1:])
+    result = LocallyFreeSheafFinitePoset(compact.stalk_dict(), compact.res_dict(), first._base_ring, first._domain_poset, compact)
+    result._summands = tuple(sheaves)
+    result._summand_offsets = summand_offsets(compacts)
+    return result
+
+def LocFreeSheaf(stalk_dict = {}, res_dict = {}, base_ring = ZZ, domain_poset = None, check = True, sample = None):
     '''
       Construct a finite locally free sheaf of modules on a poset, given 
       certain input. Checks are performed to check if the given input indeed
@@ -58,6 +153,12 @@ def LocFreeSheaf(stalk_dict = {}, res_dict = {}, base_ring = ZZ, domain_poset =
           If the domain_poset is None, a domain poset will be build from the data in the stalk-
           and restriction dictionaries.  
       
+      - ``check`` -- (default: ``True``); whether to check that the restriction maps are 
+          functorial. Set to ``False`` for trusted input.
+      
+      - ``sample`` -- (default: ``None``); if an integer, only this many randomly chosen 
+          cover relations are used in the functoriality check.
+      
       OUTPUT:
       
       An instance of  :class:`LocallyFreeSheafFinitePoset`.
@@ -85,8 +186,10 @@ def LocFreeSheaf(stalk_dict = {}, res_dict = {}, base_ring = ZZ, domain_poset =
     
     # Build the sheaf and check if it is indeed a valid sheaf. 
     sheaf = LocallyFreeSheafFinitePoset(stalk_dict, res_dict, base_ring, domain_poset)
-    if not sheaf._sheaf_data_valid():
-        raise ValueError("The sheaf data is not valid")
+    if check:
+        violation = sheaf._functoriality_violation(sample)
+        if violation is not None:
+            raise ValueError("The sheaf data is not valid: the restriction maps from {} to {} are not compatible".format(*violation))
     
     return sheaf
     
@@ -114,14 +217,25 @@ class LocallyFreeSheafFinitePoset(CategoryObject):
       
       - ``domain_poset`` -- the finite poset on which the sheaf is defined. 
     """
-    def __init__(self, stalk_dict, res_dict, base_ring, domain_poset):
+    def __init__(self, stalk_dict, res_dict, base_ring, domain_poset, compact=None):
         """
           Constructor of :class:`LocallyFreeSheafFinitePoset`
+          
+          The data is converted to a :class:`CompactSheaf`, on which all computations 
+          run, unless this compact form is given as ``compact``. 
         """
         self._stalk_dict = stalk_dict
         self._res_dict = res_dict
         self._base_ring = base_ring
         self._domain_poset = domain_poset
+        if compact is None:
+            compact = compact_sheaf(stalk_dict, res_dict, base_ring, domain_poset)
+        self._compact = compact
+        self._section_bases = None
+        self._summands = None
+        self._summand_offsets = None
+        self._stalks = LRUCache(MODULE_CACHE_SIZE)
+        self._restrictions = LRUCache(MODULE_CACHE_SIZE)
     
     def stalk(self, point):
         """
@@ -133,68 +247,66 @@ class LocallyFreeSheafFinitePoset(CategoryObject):
           
           OUTPUT:
           
-          The stalk of ``self`` at ``point``
+          The stalk of ``self`` at ``point``. The most recently used stalks are cached, 
+          internal computations only use the stalk ranks. 
+        """
+        return self._stalks.get(point, lambda: self._stalk_module(point))
+    
+    def _stalk_module(self, point):
+        """
+          Construct the stalk of ``self`` at ``point``. 
         """
         stalk = FiniteRankFreeModule(self._base_ring, self._stalk_dict[point], name="Stalk of {} at {}".format(self, point))
         stalk.basis('e')
         return stalk
     
-    def _cover_relation_to_restriction(self, relation):
+    def _restriction_matrix(self, frompoint, topoint):
         """
-          Returns the restriction morphism associated to a cover relation of the domain
-          poset of ``self``. 
+          Returns the matrix of the restriction map of ``self`` from ``frompoint`` 
+          to ``topoint``, see :meth:`CompactSheaf.restriction`.
         """
-        hom = Hom(self.stalk(relation[0]), self.stalk(relation[1]))
-        if self._res_dict[relation] == 0:
-            return hom.zero()
-        elif self._res_dict[relation] == 1:
-            return hom(identity_matrix(self._stalk_dict[relation[0]]))
-        else:
-            return hom(self._res_dict[relation])
+        index = self._compact.index()
+        return self._compact.restriction(index.point_index(frompoint), index.point_index(topoint))
     
-    def _cover_chain_to_restriction(self, chain):
-        """
-          Builds the restriction map from ``chain[0]`` to ``chain[1]`` 
-          by composing the restrictions of all cover relations in the chain.  
-        """
-        phi = self._cover_relation_to_restriction((chain[0], chain[1]))
-        for i, v in enumerate(chain[1:-1]):
-            psi = self._cover_relation_to_restriction((v, chain[i+2]))
-            phi = _composition_free_module_morphism(psi, phi)
-        return phi
-     
     def restriction(self, frompoint, topoint):
         """
           Return the restriction map of ``self`` from ``frompoint`` to ``topoint``.
+          
+          The most recently used restriction maps are cached; internal computations
+          only use their matrices, see :meth:`_restriction_matrix`. 
         """
         if not self._domain_poset.is_less_than(frompoint, topoint):
             raise ValueError("{} is not a specialization of {}".format(frompoint, topoint))
-        chains =  list(filter(lambda c: (frompoint in c) and (topoint in c), self._domain_poset.chains()))
-        chains = [c[c.index(frompoint):c.index(topoint)+1] for c in chains]
-        cover_chain = sorted(chains, key=lambda c: len(c), reverse=True)[0]
-        morphism = self._cover_chain_to_restriction(cover_chain)
+        return self._restrictions.get((frompoint, topoint), lambda: self._restriction_morphism(frompoint, topoint))
+    
+    def _restriction_morphism(self, frompoint, topoint):
+        """
+          Construct the restriction map of ``self`` from ``frompoint`` to ``topoint``.
+        """
+        hom = Hom(self.stalk(frompoint), self.stalk(topoint))
+        morphism = hom(self._restriction_matrix(frompoint, topoint))
         morphism._name = "Restriction Map of {} from {} to {}".format(self, frompoint, topoint)
         return morphism 
     
-    def _sheaf_data_valid(self):
+    def _functoriality_violation(self, sample=None):
+        """
+          Checks if the data in the restriction dictionary of ``self`` is functorial. 
+          Returns ``None`` if it is, and otherwise the first pair of points ``(x, y)`` 
+          for which two cover paths from ``x`` to ``y`` give different restriction maps,
+          see :meth:`CompactSheaf.functoriality_violation`. 
+        """
+        with profile_phase("validation"):
+            violation = self._compact.functoriality_violation(sample)
+        if violation is None:
+            return None
+        return tuple(self._compact.index().chain_points(violation))
+    
+    def _sheaf_data_valid(self, sample=None):
         """
           Checks if the data in the restriction dictionary of ``self``
-          makes a valif sheaf. That it, is check whether the provided data is functorial.
-        """
-        for relation in filter(lambda r: r[0] != r[1], self._domain_poset.relations()):
-            restriction = None
-            frompoint = relation[0]
-            topoint = relation[1]
-            chains =  list(filter(lambda c: (frompoint in c) and (topoint in c), self._domain_poset.chains()))
-            chains = [c[c.index(frompoint):c.index(topoint)+1] for c in chains]
-            maxlength = max([len(c) for c in chains])
-            cover_chains = filter(lambda c: len(c) == maxlength, chains)
-            for c in cover_chains:
-                if restriction is None:
-                    restriction = self._cover_chain_to_restriction(c)
-                elif restriction != self._cover_chain_to_restriction(c):
-                    return False
-        return True
+          makes a valid sheaf. That is, check whether the provided data is functorial.
+        """
+        return self._functoriality_violation(sample) is None
                 
     def base_ring(self):
         """
@@ -208,68 +320,367 @@ class LocallyFreeSheafFinitePoset(CategoryObject):
         """    
         return self._domain_poset
     
-    def _godement_complex_differential(self, start_base, end_base):
+    def _last_points(self, p):
+        """
+          Return the list of last points of the ``p``-chains of the domain poset. 
+        """
+        index = chain_index(self._domain_poset)
+        return index.chain_points(index.last_points(p))
+    
+    def _chain_offsets(self, p):
+        """
+          Return the offsets of the blocks of the ``p``-chains in the ``p``-th term 
+          of the Godement cochain complex, followed by the rank of that term. 
+        """
+        index = self._compact.index()
+        ranks = self._compact.ranks()
+        offsets = [0]
+        for i in index.last_points(p):
+            offsets.append(offsets[-1] + ranks[i])
+        return offsets
+    
+    def _godement_differential_tasks(self, p, workers=None):
+        """
+          Returns the tasks for :func:`_godement_differential_rows` that together build 
+          the differential of the Godement cochain complex from degree ``p`` to degree ``p+1``. 
+          The rows are split into slabs if the differential is large and ``workers`` is given.
+        """
+        index = self._compact.index()
+        col_offsets = self._chain_offsets(p)
+        row_offsets = self._chain_offsets(p + 1)
+        chains = index.chain_array(p + 1)
+        faces = index.face_array(p + 1)
+        tasks = []
+        for start, stop in slabs(index.nchains(p + 1), workers):
+            slab_chains = chains[start*(p+2):stop*(p+2)]
+            restrictions = dict()
+            for k in range(stop - start):
+                pair = (slab_chains[k*(p+2) + p], slab_chains[k*(p+2) + p + 1])
+                if pair not in restrictions:
+                    restrictions[pair] = self._compact.restriction(*pair)
+            tasks.append((p, slab_chains, faces[start*(p+2):stop*(p+2)], row_offsets[start:stop+1], col_offsets, restrictions))
+        return tasks
+    
+    def _godement_complex_differentials(self, degrees, workers=None):
+        """
+          Construct the differentials of the godement cochain complex from the degrees 
+          ``p`` in ``degrees`` to ``p+1`` as sparse matrices, in a dictionary keyed by ``p``. 
+          
+          Only the faces of a ``(p+1)``-chain contribute to its row of blocks; they are 
+          looked up in the chain index, and the signed identity or restriction block 
+          is written at the precomputed column offset of the face. If ``workers`` is given,
+          the degrees and the slabs of rows of large degrees are built on a pool of that many 
+          processes; the result is the same as without workers. 
+          
+          Without workers, every degree is built separately, so that it is measured as
+          a phase of its own while profiling, see :func:`profiling`.
+        """
+        if workers is None or workers <= 1:
+            groups = [[p] for p in degrees]
+        else:
+            groups = [list(degrees)]
+        differentials = dict()
+        for group in groups:
+            with profile_phase("differential", group[0] if len(group) == 1 else None):
+                tasks = []
+                for p in group:
+                    tasks.extend(self._godement_differential_tasks(p, workers))
+                results = pool_map(_godement_differential_rows, tasks, workers)
+                entries = {p:dict() for p in group}
+                for task, result in zip(tasks, results):
+                    entries[task[0]].update(result)
+                for p in group:
+                    nrows = self._chain_offsets(p + 1)[-1]
+                    ncols = self._chain_offsets(p)[-1]
+                    differentials[p] = matrix(self._base_ring, nrows, ncols, entries[p], sparse=True)
+        report = active_report()
+        if report is not None:
+            for p in degrees:
+                report.record_matrix("differential", p, differentials[p])
+        return differentials
+    
+    def _godement_complex_differential(self, p):
         """
           Construct the differential of the godement cochain complex from 
-          the free module with basis ``start_base`` to the free module with basis
-          ``end_base``.
+          degree ``p`` to degree ``p+1`` as a sparse matrix.
         """
-        
-        rows = []
-        for to_chain in end_base:
-            blocks = []
-            m = self._stalk_dict[to_chain[-1]]
-            for from_chain in start_base:
-                n = self._stalk_dict[from_chain[-1]]
-                if all(x in to_chain for x in from_chain):
-                    for point in to_chain:
-                        if point not in from_chain:
-                            index = to_chain.index(point)
-                            sign = 1 if index % 2 == 0 else - 1
-                            if index != len(to_chain) - 1:
-                                blocks.append(sign*identity_matrix(self._base_ring, m))
-                            else:
-                                mat = self.restriction(from_chain[-1], point).matrix()
-                                blocks.append(sign*mat)
-                            break 
-                else:
-                    blocks.append(Matrix(self._base_ring, m, n))
-            rows.append(blocks)
-        return block_matrix(rows, subdivide=False)
-        
+        return self._godement_complex_differentials([p])[p]
     
-    def godement_cochain_complex(self):
+    def godement_cochain_complex(self, workers=None, backend="sage"):
         """
           Construct the Godement cochain complex of ``self``. 
+          
+          If ``workers`` is given, the differentials are built on a pool of that many processes. 
+          If the persistent cache is enabled, the differentials are looked up there first, 
+          see :func:`set_persistent_cache`. 
+          
+          If ``backend`` is ``"numpy"``, the differentials are instead returned as 
+          ``scipy.sparse`` matrices of floats, in a dictionary keyed by the degree of their 
+          domain, see :func:`godement_differentials`. This requires scipy. 
+        """
+        if backend == "numpy":
+            return godement_differentials(self, range(chain_index(self._domain_poset).dimension() + 1))
+        if backend != "sage":
+            raise ValueError("Unknown backend {}".format(backend))
+        cache = persistent_cache(self._base_ring)
+        if cache is not None:
+            cached = cache.load_matrices(self._compact.content_hash(), "godement", self._base_ring)
+            if cached is not None:
+                return ChainComplex(dict(zip(*cached)), base_ring = self._base_ring)
+        dim = chain_index(self._domain_poset).dimension()
+        diff_dict = self._godement_complex_differentials(range(dim + 1), workers)
+        if cache is not None:
+            degrees = sorted(diff_dict)
+            cache.store_matrices(self._compact.content_hash(), "godement", self._base_ring, degrees, [diff_dict[p] for p in degrees])
+        return ChainComplex(diff_dict, base_ring = self._base_ring)
+    
+    def _godement_cochain_complex_at(self, degree, workers=None):
         """
-        # The case that the domain_space has dimension 0
-        if self._domain_poset.height() == 1:
-            rank = sum(self._stalk_dict[key] for key in self._stalk_dict)
-            differential = matrix(self._base_ring, 0, rank)
-            return ChainComplex([rank, differential], base_ring=self._base_ring)
+          Construct the part of the Godement cochain complex of ``self`` that is needed 
+          for the cohomology in degree ``degree``: only the differentials into and out of
+          that degree are built, so only the chains with ``degree``, ``degree+1`` and 
+          ``degree+2`` points are enumerated. 
+        """
+        dim = chain_index(self._domain_poset).dimension()
+        degrees = [p for p in (degree - 1, degree) if 0 <= p <= dim]
+        diff_dict = self._godement_complex_differentials(degrees, workers)
+        return ChainComplex(diff_dict, base_ring = self._base_ring)
+    
+    def morse_complex(self):
+        """
+          Return a Morse reduction of the Godement cochain complex of ``self``. 
+          
+          OUTPUT:
+          
+          A tuple ``(complex, report)``, where ``complex`` is a cochain complex with 
+          the same cohomology as the Godement cochain complex and ``report`` maps every 
+          degree to the ranks of the Godement complex and of ``complex`` in that degree.
+          See :func:`morse_reduction`.
+        """
+        return morse_reduction(self.godement_cochain_complex())
+    
+    def cellular_cochain_complex(self, signs=None, check=False):
+        """
+          Construct the cellular cochain complex of ``self``. 
+          
+          This requires the domain poset of ``self`` to be the face poset of a regular
+          CW complex, for example of a simplicial complex. The term in degree ``k`` is
+          the direct sum of the stalks at the cells of dimension ``k``, and the differential
+          consists of the cover restrictions multiplied by the incidence signs. The
+          cohomology of this complex is the cohomology of ``self``, but the complex is
+          much smaller than the Godement cochain complex. 
+          
+          INPUT:
+          
+          - ``signs`` -- (default: ``None``); the incidence signs, given as a dictionary 
+              or a function on the cover relations of the domain poset with values ``1`` 
+              and ``-1``. If ``None``, incidence signs are computed, see :func:`incidence_signs`. 
+          
+          - ``check`` -- (default: ``False``); if ``True``, it is also checked that the 
+              boundary of every cell has the homology of a sphere, see :func:`incidence_signs`. 
+        """
+        index = chain_index(self._domain_poset)
+        points = index.points()
+        dimensions = _cell_dimensions(index)
+        if signs is None:
+            sign_table = _incidence_signs(index, check)
+        else:
+            if not callable(signs):
+                signs = lambda a, b, table=signs: table[(a, b)]
+            sign_table = {(i, j):signs(points[i], points[j]) for i, j in index.cover_relations()}
+            _check_incidence_signs(index, sign_table, check)
+        
+        # offsets of the stalks in the terms of the complex
+        dim = max(dimensions) if dimensions else -1
+        offsets = [0]*len(points)
+        ranks = [0]*(dim + 2)
+        for i in range(len(points)):
+            offsets[i] = ranks[dimensions[i]]
+            ranks[dimensions[i]] += self._compact.rank(i)
         
-        # Other cases
-        end_base = sorted([[x] for x in self._domain_poset.list()])
-        diff_dict = dict()
-        for p in range(1, self._domain_poset.height()):
-            start_base = end_base
-            end_base = list(filter(lambda c: len(c)==p+1, self._domain_poset.chains()))
-            end_base = sorted(end_base)
-            diff_dict[p-1] = self._godement_complex_differential(start_base, end_base)
+        entries = {k:dict() for k in range(dim + 1)}
+        for e, (i, j) in enumerate(index.cover_relations()):
+            sign = sign_table[(i, j)]
+            mat = self._compact.cover_block(e)
+            block = entries[dimensions[i]]
+            for (a, b), value in mat.dict().items():
+                block[(offsets[j] + a, offsets[i] + b)] = sign*value
+        diff_dict = {k:matrix(self._base_ring, ranks[k + 1], ranks[k], entries[k], sparse=True) for k in range(dim + 1)}
         return ChainComplex(diff_dict, base_ring = self._base_ring)
     
-    def cohomology(self, degree=None):
+    def _cochain_complex(self, degree=None, reduced=False, method="godement", signs=None, workers=None):
+        """
+          Return the cochain complex used to compute the cohomology of ``self``, see
+          :meth:`cohomology` for the input. If ``degree`` is given, the complex may be
+          truncated to the terms around that degree. 
+        """
+        if method == "godement":
+            if degree is None:
+                complex = self.godement_cochain_complex(workers)
+            else:
+                complex = self._godement_cochain_complex_at(degree, workers)
+        elif method == "cellular":
+            complex = self.cellular_cochain_complex(signs)
+        else:
+            raise ValueError("Unknown method {}".format(method))
+        if reduced:
+            complex = morse_reduction(complex)[0]
+        return complex
+    
+    def cohomology(self, degree=None, reduced=False, method="godement", signs=None, ranks_only=False, primes=None, workers=None, backend="sage", tol=None):
         """
           Return the cohomology of ``self``. 
+          
+          INPUT:
+          
+          - ``degree`` -- (default: ``None``); if given, only the cohomology in this degree 
+              is returned. 
+          
+          - ``reduced`` -- (default: ``False``); if ``True``, the cochain complex is first 
+              reduced to its Morse complex, see :func:`morse_reduction`.
+          
+          - ``method`` -- (default: ``"godement"``); the cochain complex to use, either 
+              ``"godement"`` for the Godement cochain complex or ``"cellular"`` for the 
+              cellular cochain complex, which is only available on face posets of regular 
+              CW complexes. See :meth:`cellular_cochain_complex`.
+          
+          - ``signs`` -- (default: ``None``); the incidence signs for the cellular cochain complex. 
+          
+          - ``ranks_only`` -- (default: ``False``); if ``True``, only the Betti numbers are 
+              computed, see :meth:`betti_numbers`.
+          
+          - ``primes`` -- (default: ``None``); the primes used for the ranks over ``ZZ`` 
+              if ``ranks_only`` is ``True``. 
+          
+          - ``workers`` -- (default: ``None``); if given, the differentials are built, and 
+              the cohomology in the different degrees is computed, on a pool of that many 
+              processes. 
+          
+          - ``backend`` -- (default: ``"sage"``); if ``"numpy"``, the coefficients are 
+              treated as real numbers: the differentials are built as ``scipy.sparse`` matrices 
+              of floats and only the dimensions of the cohomology are returned, computed as 
+              the dimensions of the kernels of the sparse Hodge Laplacians, so ``ranks_only`` 
+              makes no difference. This is meant for sheaves over ``RDF`` or ``RR``, and 
+              requires scipy. Morse reduction, ``primes`` and ``workers`` are not supported. 
+          
+          - ``tol`` -- (default: ``None``); the eigenvalue tolerance of the Hodge Laplacians 
+              if ``backend`` is ``"numpy"``, see :func:`numeric_cohomology`. 
+        """
+        if backend == "numpy":
+            if reduced:
+                raise ValueError("The numpy backend does not support Morse reduction")
+            if primes is not None:
+                raise ValueError("The numpy backend does not compute modular ranks")
+            if workers is not None:
+                raise ValueError("The numpy backend does not support workers")
+            return numeric_cohomology(cochain_differentials(self, method, signs), degree, tol)
+        if backend != "sage":
+            raise ValueError("Unknown backend {}".format(backend))
+        if ranks_only:
+            return self.betti_numbers(degree, reduced, method, signs, primes, workers)
+        # given incidence signs cannot be hashed in general, so they bypass the cache
+        cache = persistent_cache(self._base_ring) if signs is None else None
+        name = "cohomology_{}".format(method)
+        if reduced:
+            name += "_reduced"
+        if degree is not None:
+            name += "_{}".format(degree)
+        if cache is not None:
+            entry = cache.get(self._compact.content_hash(), name)
+            if entry is not None:
+                return _cohomology_from_data(entry[0], self._base_ring)
+        result = self._compute_cohomology(degree, reduced, method, signs, workers)
+        if cache is not None:
+            cache.put(self._compact.content_hash(), name, _cohomology_data(result), dict())
+        return result
+    
+    def _compute_cohomology(self, degree, reduced, method, signs, workers):
+        """
+          Compute the cohomology of ``self``, see :meth:`cohomology`. 
+        """
+        if degree is not None:
+            complex = self._cochain_complex(degree, reduced, method, signs, workers)
+            with profile_phase("homology", degree):
+                return complex.homology(degree)
+        complex = self._cochain_complex(None, False, method, signs, workers)
+        degrees = complex.nonzero_degrees()
+        if reduced:
+            # the Morse complex has no terms in the degrees where everything collapsed, 
+            # there the cohomology is zero
+            complex = morse_reduction(complex)[0]
+        if workers is None:
+            # the homology in all degrees is computed degree by degree, as in ``homology()``
+            result = dict()
+            for p in degrees:
+                with profile_phase("homology", p):
+                    result[p] = complex.homology(p)
+            return result
+        tasks = [(p, complex.differential(p - 1), complex.differential(p), self._base_ring) for p in degrees]
+        with profile_phase("homology"):
+            return dict(zip(degrees, pool_map(_homology_in_degree, tasks, workers)))
+    
+    def betti_numbers(self, degree=None, reduced=False, method="godement", signs=None, primes=None, workers=None):
+        """
+          Return the Betti numbers of ``self``, that is, the ranks of its cohomology 
+          modules, or of their free parts over ``ZZ``. 
+          
+          No cohomology modules are computed: the Betti number in degree ``p`` is the rank
+          of the ``p``-th term of the cochain complex minus the ranks of the differentials 
+          out of and into it. Over a field the ranks are computed by sparse elimination, over 
+          ``ZZ`` modulo the primes ``primes``, see :func:`matrix_rank`. The other input 
+          is as for :meth:`cohomology`. 
+          
+          OUTPUT:
+          
+          The Betti number in degree ``degree``, or a dictionary with the Betti numbers in 
+          all degrees if ``degree`` is ``None``. 
+        """
+        if degree is not None:
+            complex = self._cochain_complex(degree, reduced, method, signs, workers)
+            return betti_numbers(complex, [degree], primes, workers)[degree]
+        complex = self._cochain_complex(None, False, method, signs, workers)
+        degrees = sorted(p for p in complex.differential() if p >= 0)
+        if reduced:
+            complex = morse_reduction(complex)[0]
+        return betti_numbers(complex, degrees, primes, workers)
+    
+    def hodge_laplacian(self, degree, method="godement", signs=None):
+        """
+          Return the Hodge Laplacian ``d^T d + d d^T`` of ``self`` in degree ``degree``, as a 
+          ``scipy.sparse`` matrix of floats. The differentials are those of the Godement or 
+          the cellular cochain complex, as chosen by ``method``, see :meth:`cohomology`.
+          This requires scipy. 
         """
-        return self.godement_cochain_complex().homology(degree)
+        return hodge_laplacian(cochain_differentials(self, method, signs), degree)
+    
+    def harmonic_representatives(self, degree, tol=None, method="godement", signs=None):
+        """
+          Return an orthonormal basis of the harmonic cochains of ``self`` in degree ``degree``,
+          as the columns of a numpy array. They represent a basis of the real cohomology in 
+          that degree, for example the global sections in degree ``0``. 
+          
+          The harmonic cochains are the kernel of the Hodge Laplacian, computed with the 
+          eigenvalue tolerance ``tol``, see :func:`harmonic_cochains`. The other input is as 
+          for :meth:`hodge_laplacian`. 
+        """
+        return harmonic_cochains(self.hodge_laplacian(degree, method, signs), tol)
+    
+    def harmonic_projection(self, cochain, degree, method="godement", signs=None):
+        """
+          Return the harmonic part of the cochain ``cochain`` of ``self`` in degree ``degree``, 
+          given as a vector of floats, computed by sparse least squares, see 
+          :func:`harmonic_projection`. The harmonic part of a cocycle is the harmonic 
+          representative of its cohomology class. The other input is as for :meth:`hodge_laplacian`.
+        """
+        return harmonic_projection(cochain_differentials(self, method, signs), degree, cochain)
     
     def global_sections(self):
         """
           Return the global sections of ``self``.  
         """
-        c = self.cohomology(0)
-        return FiniteRankFreeModule(self._base_ring, c.ngens(), name="Global Sections of {}".format(self))
+        differential = self._godement_complex_differential(0)
+        rank = differential.ncols() - differential.rank()
+        return FiniteRankFreeModule(self._base_ring, rank, name="Global Sections of {}".format(self))
     
     def extend_by_zero(self, inclusion_map):
         """
@@ -308,14 +719,86 @@ class LocallyFreeSheafFinitePoset(CategoryObject):
         return LocallyFreeSheafFinitePoset(target_stalks, target_res, base_ring = self._base_ring, domain_poset = target_poset)
     
     def pushforward(self, poset_map):
-        if self._domain_poset.cardinality() == 1:
-            point = self._domain_poset.list()[0]
-            image = poset_map(point)
-            supported = poset_map.codomain().order_ideal([image])
-            stalks = {x:self._stalk_dict[point] if x in supported else 0 for x in poset_map.codomain().list()}
-            restrictions = {tuple(r):1 if r[1] in supported else 0 for r in poset_map.codomain().cover_relations()}
-            return LocallyFreeSheafFinitePoset(stalks, restrictions, self._base_ring, poset_map.codomain())
-        raise NotImplementedError("For now only sheaves on a singleton can be pushed forward")
+        """
+          Return the pushforward of ``self`` along the order preserving map ``poset_map``.
+          
+          The stalk of the pushforward at a point ``y`` of the codomain is the module of 
+          sections of ``self`` over the preimage of the up-set of ``y``. See 
+          :meth:`derived_pushforward`, of which this is the degree ``0``. 
+        """
+        return self.derived_pushforward(poset_map, 0)
+    
+    def derived_pushforward(self, poset_map, degree):
+        """
+          Return the derived pushforward of ``self`` along the order preserving map 
+          ``poset_map`` in degree ``degree``. 
+          
+          The stalk at a point ``y`` of the codomain is the cohomology in degree ``degree`` of 
+          ``self`` restricted to the preimage ``U_y`` of the up-set of ``y``, and the restriction
+          from ``y`` to ``z`` is induced by the inclusion of ``U_z`` in ``U_y``. 
+          
+          The preimages are open, so the Godement cochain complex of the restriction of 
+          ``self`` to ``U_y`` is the quotient of the Godement cochain complex of ``self`` by the 
+          chains that do not start in ``U_y``. Hence the Godement differentials of ``self`` 
+          are built once, around degree ``degree``, and every stalk is computed on the 
+          rows and columns of the chains that start in ``U_y``; the restriction maps 
+          forget the chains that do not start in ``U_z``. 
+          
+          Over ``ZZ``, a ``ValueError`` is raised if the cohomology has torsion on some 
+          preimage, since the result would not be locally free. 
+        """
+        codomain = poset_map.codomain()
+        index = self._compact.index()
+        target = chain_index(codomain)
+        
+        # the preimages of the up-sets of the codomain, as bitsets of points of the domain
+        fibres = [0]*target.cardinality()
+        for i, x in enumerate(index.points()):
+            fibres[target.point_index(poset_map(x))] |= 1 << i
+        preimages = []
+        for j in range(target.cardinality()):
+            bits = fibres[j]
+            for k in target.points_above(j):
+                bits |= fibres[k]
+            preimages.append(bits)
+        
+        degrees = [p for p in (degree - 1, degree) if 0 <= p <= index.dimension()]
+        differentials = self._godement_complex_differentials(degrees)
+        offsets = {p:self._chain_offsets(p) for p in (degree - 1, degree, degree + 1)}
+        for p in (degree - 1, degree):
+            if p not in differentials:
+                differentials[p] = matrix(self._base_ring, offsets[p + 1][-1], offsets[p][-1], sparse=True)
+        first_points = {p:index.chain_array(p)[::p+1] if p >= 0 else [] for p in offsets}
+        
+        def coordinates(p, bits):
+            # the coordinates of the p-th Godement term of the chains that start in ``bits``
+            chain_offsets = offsets[p]
+            return [c for k, first in enumerate(first_points[p]) if bits >> first & 1 for c in range(chain_offsets[k], chain_offsets[k + 1])]
+        
+        columns, bases, classes = [], [], []
+        for bits in preimages:
+            cols = coordinates(degree, bits)
+            d_out = differentials[degree].matrix_from_rows_and_columns(coordinates(degree + 1, bits), cols)
+            d_in = differentials[degree - 1].matrix_from_rows_and_columns(cols, coordinates(degree - 1, bits))
+            kernel = d_out.right_kernel()
+            basis, coordinate_function = _quotient_basis(kernel, kernel.submodule(d_in.columns()))
+            columns.append(cols)
+            bases.append(basis)
+            classes.append(coordinate_function)
+        
+        points = target.points()
+        stalks = {points[j]:len(bases[j]) for j in range(len(points))}
+        restrictions = dict()
+        for i, j in target.cover_relations():
+            position = {c:k for k, c in enumerate(columns[i])}
+            kept = [position[c] for c in columns[j]]
+            entries = dict()
+            for b, v in enumerate(bases[i]):
+                for a, value in enumerate(classes[j](vector(self._base_ring, [v[k] for k in kept]))):
+                    if value != 0:
+                        entries[(a, b)] = value
+            restrictions[(points[i], points[j])] = matrix(self._base_ring, len(bases[j]), len(bases[i]), entries, sparse=True)
+        return LocallyFreeSheafFinitePoset(stalks, restrictions, self._base_ring, codomain)
     
     def restrict_to(self, open_set):
         """
@@ -326,78 +809,232 @@ class LocallyFreeSheafFinitePoset(CategoryObject):
         if any(r[1] not in open_set for r in filter(lambda x: x[0] in open_set, self._domain_poset.relations())):
             raise ValueError("The given set is not upward closed.")
             
-        s_dict = dict(filter(lambda (key, value): key in open_set, self._stalk_dict.items()))
-        r_dict = dict(filter(lambda (key, value): key[0] in open_set, self._res_dict.items()))
+        s_dict = {key:value for key, value in self._stalk_dict.items() if key in open_set}
+        r_dict = {key:value for key, value in self._res_dict.items() if key[0] in open_set}
         poset_dict = {x:self._domain_poset.order_filter([x])[1:] for x in s_dict}
         return LocallyFreeSheafFinitePoset(s_dict, r_dict, self._base_ring, Poset(poset_dict))
         
+    def _extend_sections(self, index, basis, i):
+        """
+          Extend a basis of the sections of ``self`` on an open set ``U`` to a basis of the 
+          sections on ``U`` together with the point with number ``i``, which must be minimal 
+          in the union. 
+          
+          A basis is a pair ``(rank, blocks)``, where ``blocks`` maps the number of every 
+          point of the open set to the matrix whose columns are the values of the basis 
+          sections in the stalk at that point. A section on the larger open set is a value 
+          in the stalk at ``i`` together with a section on ``U`` that agree on the upper 
+          covers of ``i``, so only a kernel involving these covers is computed. 
+        """
+        rank, blocks = basis
+        m = self._compact.rank(i)
+        edges = index.cover_edges(i)
+        relations = matrix(self._base_ring, sum(self._compact.rank(index.cover_target(e)) for e in edges), m + rank)
+        row = 0
+        for e in edges:
+            j = index.cover_target(e)
+            relations.set_block(row, 0, self._compact.cover_block(e))
+            relations.set_block(row, m, -blocks[j])
+            row += self._compact.rank(j)
+        kernel = relations.right_kernel_matrix().transpose()
+        extension = kernel.matrix_from_rows(range(m, m + rank))
+        new_blocks = {j:block * extension for j, block in blocks.items()}
+        new_blocks[i] = kernel.matrix_from_rows(range(m))
+        return kernel.ncols(), new_blocks
+    
+    def sections_on_opens(self, opens=None):
+        """
+          Return the sections of ``self`` on the open sets ``opens``, or on all open sets 
+          of the domain poset.
+          
+          The open sets are the up-sets of the domain poset. The sections on an open set 
+          ``U`` are computed from the sections on ``U`` minus its first point in the linear 
+          extension ``poset.list()``, which is minimal in ``U``, see :meth:`_extend_sections`. 
+          Without ``opens``, the open sets are enumerated along these extensions, so every
+          open set is visited once. Otherwise, the bases of the sections on the given open
+          sets and on the smaller open sets used to compute them are kept on ``self`` and 
+          reused by later calls. 
+          
+          INPUT:
+          
+          - ``opens`` -- (default: ``None``); an iterable of open sets, each given as an 
+              iterable of points of the domain poset. 
+          
+          OUTPUT:
+          
+          A dictionary that maps the ``frozenset`` of the points of every open set to the 
+          module of sections on it. 
+        """
+        index = chain_index(self._domain_poset)
+        ranks = dict()
+        if opens is None:
+            stack = [(0, index.cardinality(), (0, dict()))]
+            while stack:
+                bits, first, basis = stack.pop()
+                ranks[bits] = basis[0]
+                for i in range(first):
+                    if index.up_set(i) & ~bits == 0:
+                        stack.append((bits | 1 << i, i, self._extend_sections(index, basis, i)))
+        else:
+            if self._section_bases is None:
+                self._section_bases = {0:(0, dict())}
+            bases = self._section_bases
+            for open_set in opens:
+                bits = 0
+                for x in open_set:
+                    bits |= 1 << index.point_index(x)
+                if any(index.up_set(i) & ~bits for i in _bits(bits)):
+                    raise ValueError("The given set is not upward closed.")
+                
+                # remove first points until the sections are known, then add them back
+                removed = []
+                rest = bits
+                while rest not in bases:
+                    first = rest & -rest
+                    removed.append(first.bit_length() - 1)
+                    rest ^= first
+                for i in reversed(removed):
+                    bases[rest | 1 << i] = self._extend_sections(index, bases[rest], i)
+                    rest |= 1 << i
+                ranks[bits] = bases[bits][0]
+        sections = dict()
+        for bits, rank in ranks.items():
+            open_set = index.chain_points(_bits(bits))
+            name = "Sections of {} on {}".format(self, open_set)
+            sections[frozenset(open_set)] = FiniteRankFreeModule(self._base_ring, rank, name=name)
+        return sections
+    
     def sections(self, open_set):    
         """
-          Return the sections of ``self`` on ``open_set``.
+          Return the sections of ``self`` on ``open_set``, see :meth:`sections_on_opens`.
         """
-        s = self.restrict_to(open_set).global_sections()
-        s._name = "Sections of {} on {}".format(self, open_set)
-        return s
+        return self.sections_on_opens([open_set])[frozenset(open_set)]
     
     def euler_characteristic(self):
         """
           Calculate the Euler Characteristic of ``self``. 
+          
+          The Euler characteristic is the alternating sum of the ranks of the terms of 
+          the Godement cochain complex, so no cohomology is computed. A point ``x`` 
+          contributes its stalk rank times the alternating count of the chains that 
+          end in ``x``, and these counts satisfy ``e(x) = 1 - sum(e(y) for y < x)``. 
         """
-        coh = self.cohomology()
+        index = self._compact.index()
+        counts = []
         result = 0
-        alt = lambda x: 1 if x%2 == 0 else -1
-        for key, value in coh.items():
-            result += alt(key)*value.ngens()
+        for i in range(index.cardinality()):
+            counts.append(1 - sum(counts[j] for j in index.points_below(i)))
+            result += counts[i]*self._compact.rank(i)
         return result 
     
     def godement_sheaf(self):
         """
-          Returns the Godement sheaf of ``self``.
+          Returns the Godement sheaf of ``self``, together with the embedding of ``self`` into it. 
+          
+          The stalk of the Godement sheaf at ``x`` is the direct sum of the stalks of ``self``
+          at the points ``y >= x``, in the order of their numbers in the chain index. The up-sets
+          are read from the bitsets of the chain index, the restriction maps of the Godement 
+          sheaf are sparse projections, and the component of the embedding at ``x`` stacks 
+          the restriction matrices from ``x`` to the points ``y >= x``. 
+          
+          OUTPUT:
+          
+          A tuple ``(epsilon, G0)`` of the Godement sheaf ``G0`` and the embedding ``epsilon``.
         """
-        g0_stalks = dict()
-        g0_res = dict()
-        for p in self._domain_poset.list():
-            g0_stalks[p] = sum(self._stalk_dict[x] for x in self._domain_poset.order_filter([p]))
-        for relation in self._domain_poset.cover_relations():
-            frombase = sorted(self._domain_poset.order_filter([relation[0]]))
-            tobase = sorted(self._domain_poset.order_filter([relation[1]]))
-            rows = []
-            for row in tobase:
-                m = self._stalk_dict[row]
-                blocks = []
-                for x in frombase:
-                    if x == row:
-                        blocks.append(identity_matrix(m))
-                    else:
-                        blocks.append(Matrix(m, self._stalk_dict[x]))
-                rows.append(blocks)    
-            g0_res[tuple(relation)] = block_matrix(rows, subdivide=False)    
-        G0 = LocallyFreeSheafFinitePoset(g0_stalks, g0_res, self._base_ring, self._domain_poset)
-        hom = Hom(self, G0)
-        eps_dict = dict()
-        for p in self._domain_poset.list():
-            rows = []
-            for x in sorted(self._domain_poset.order_filter([p])):
-                if x == p:
-                    rows.append([identity_matrix(self._base_ring, self._stalk_dict[p])])
-                else:
-                    rows.append([self.restriction(p, x).matrix()])
-            eps_dict[p] = block_matrix(rows, subdivide=False)
-        epsilon = hom(eps_dict)
-        return epsilon, G0  
+        compact = self._compact
+        index = compact.index()
+        up_sets = [[i] + list(index.points_above(i)) for i in range(index.cardinality())]
+        offsets = []
+        ranks = []
+        for up_set in up_sets:
+            block_offsets = dict()
+            rank = 0
+            for y in up_set:
+                block_offsets[y] = rank
+                rank += compact.rank(y)
+            offsets.append(block_offsets)
+            ranks.append(rank)
+        blocks = []
+        for a, b in index.cover_relations():
+            entries = dict()
+            for y in up_sets[b]:
+                row, col = offsets[b][y], offsets[a][y]
+                for l in range(compact.rank(y)):
+                    entries[(row + l, col + l)] = 1
+            blocks.append(matrix(self._base_ring, ranks[b], ranks[a], entries, sparse=True))
+        g0_compact = CompactSheaf(index, self._base_ring, ranks, blocks)
+        G0 = LocallyFreeSheafFinitePoset(g0_compact.stalk_dict(), g0_compact.res_dict(), self._base_ring, self._domain_poset, g0_compact)
         
-    def _direct_sum(self, other):
-        if not (self._base_ring == other._base_ring and self._domain_poset == other._domain_poset):
-            raise TypeError("Sheaves are not defined on same poset or not defined over same ring")
-        direct_sum_stalks = {x:self._stalk_dict[x] + other._stalk_dict[x] for x in self._domain_poset.list()}
-        direct_sum_res = {tuple(r):block_diagonal_matrix(self.restriction(r[0], r[1]).matrix(), other.restriction(r[0], r[1]).matrix(), subdivide = False) for r in self._domain_poset.cover_relations()}
-        return LocallyFreeSheafFinitePoset(direct_sum_stalks, direct_sum_res, self._base_ring, self._domain_poset)
+        eps_matrices = []
+        for i, up_set in enumerate(up_sets):
+            entries = dict()
+            for y in up_set:
+                row = offsets[i][y]
+                for (a, b), value in compact.restriction(i, y).dict().items():
+                    entries[(row + a, b)] = value
+            mat = matrix(self._base_ring, ranks[i], compact.rank(i), entries, sparse=True)
+            mat.set_immutable()
+            eps_matrices.append(mat)
+        epsilon = Hom(self, G0)._from_matrices(eps_matrices)
+        return epsilon, G0  
+    
+    def summands(self):
+        """
+          Return the tuple of summands of ``self`` if it was constructed with :func:`direct_sum`, 
+          and ``None`` otherwise. 
+        """
+        return self._summands
+    
+    def _summand(self, k):
+        """
+          Return the ``k``-th summand of ``self``. 
+        """
+        if self._summands is None:
+            raise ValueError("{} is not constructed as a direct sum".format(self))
+        return self._summands[k]
+    
+    def _summand_matrices(self, k, transpose):
+        """
+          Return the matrices of the injection of the ``k``-th summand of ``self`` into ``self``,
+          or of the projection onto it if ``transpose`` is ``True``, indexed by point number. 
+        """
+        summand = self._summand(k)._compact
+        offsets = self._summand_offsets[k]
+        matrices = []
+        for i in range(summand.index().cardinality()):
+            m = summand.rank(i)
+            entries = {(offsets[i] + l, l):1 for l in range(m)}
+            mat = matrix(self._base_ring, self._compact.rank(i), m, entries, sparse=True)
+            if transpose:
+                mat = mat.transpose()
+            mat.set_immutable()
+            matrices.append(mat)
+        return matrices
+    
+    def injection(self, k):
+        """
+          Return the injection of the ``k``-th summand of ``self`` into ``self``, if ``self`` 
+          was constructed with :func:`direct_sum`. 
+        """
+        hom = Hom(self._summand(k), self)
+        return hom._from_matrices(self._summand_matrices(k, False), name="injection of summand {}".format(k))
+    
+    def projection(self, k):
+        """
+          Return the projection of ``self`` onto its ``k``-th summand, if ``self`` was 
+          constructed with :func:`direct_sum`. 
+        """
+        hom = Hom(self, self._summand(k))
+        return hom._from_matrices(self._summand_matrices(k, True), name="projection onto summand {}".format(k))
     
     def __add__(self, other):
-        return self._direct_sum(other)
+        return direct_sum(self, other)
     
     def __radd__(self, other):
-        return other._direct_sum(self)
+        # ``sum`` starts with 0
+        if other == 0:
+            return self
+        return direct_sum(other, self)
             
     def _latex_(self):
         return r'\mbox{' + str(self) + r'}'
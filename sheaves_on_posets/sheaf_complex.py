@@ -1,29 +1,36 @@
 
+from array import array
+
 from sage.structure.category_object import CategoryObject
-from sage.combinat.posets.posets import Poset
 from sage.categories.homset import Hom
 from sage.rings.integer_ring import ZZ
 
-from sage.matrix.special import identity_matrix
-from sage.matrix.special import block_matrix
 from sage.matrix.constructor import matrix
-from .sheaf import LocallyFreeSheafFinitePoset
+from sage.homology.chain_complex import ChainComplex
+from .sheaf import LocallyFreeSheafFinitePoset, _godement_differential_rows
+from .chain_index import chain_index
+from .compact import CompactSheaf
+from .parallel import pool_map
+from .morse import morse_reduction
+from .instrument import profile_phase
 
 class LocFreeSheafComplex(CategoryObject):
     
-    def __init__(self, data, name="complex of sheaves"):
+    def __init__(self, data, name="complex of sheaves", check=True):
         self._name = name
+        self._check = check
         self._base_ring = data[1]._base_ring
         self._domain_poset = data[1]._domain_poset
         self._min = data[0]
         self._sheaves = dict()
         self._diff = dict()
+        self._differentials = dict()
         for c, v in enumerate(data[1:]):
             if c%2 == 0:
                 self._sheaves[self._min + c//2] = v
             else:
                 self._diff[self._min + (c-1)//2] = v
-        if not self._check_zero_composition():
+        if check and not self._check_zero_composition():
             raise ValueError("Not all compositions of differentials are zero")
                              
     def below_bound(self):
@@ -40,10 +47,18 @@ class LocFreeSheafComplex(CategoryObject):
         return self._sheaves[place]
     
     def differential(self, place):
-        hom = Hom(self.sheaf_at(place), self.sheaf_at(place + 1))
-        if place not in self._diff:
-            return hom.zero()
-        return hom(self._diff[place], name="differential of {} at degree {}".format(self._name, place))
+        """
+          Return the differential of ``self`` from degree ``place``. Every differential is 
+          constructed, and checked to be a morphism of sheaves unless ``self`` was built 
+          with ``check=False``, only once. 
+        """
+        if place not in self._differentials:
+            hom = Hom(self.sheaf_at(place), self.sheaf_at(place + 1))
+            if place not in self._diff:
+                self._differentials[place] = hom.zero()
+            else:
+                self._differentials[place] = hom(self._diff[place], name="differential of {} at degree {}".format(self._name, place), check=self._check)
+        return self._differentials[place]
     
     def _check_zero_composition(self):
         next_diff = self.differential(self.below_bound())
@@ -54,6 +69,104 @@ class LocFreeSheafComplex(CategoryObject):
                 return False
         return True
     
+    def _total_offsets(self, n):
+        """
+          Return the offsets of the terms ``G^p(F^q)`` with ``p+q = n`` of the total Godement 
+          complex in degree ``n``, in a dictionary keyed by ``q``, followed by the rank of 
+          the total complex in degree ``n``. 
+        """
+        dim = chain_index(self._domain_poset).dimension()
+        offsets = dict()
+        rank = 0
+        for q in range(self.below_bound(), self.above_bound() + 1):
+            if 0 <= n - q <= dim:
+                offsets[q] = rank
+                rank += self.sheaf_at(q)._chain_offsets(n - q)[-1]
+        return offsets, rank
+    
+    def _total_differential(self, n):
+        """
+          Construct the differential of the total Godement complex from degree ``n`` to 
+          degree ``n+1`` as a sparse matrix. 
+          
+          On the term ``G^p(F^q)``, the differential is ``d + (-1)^p delta``, where ``d``
+          is the Godement differential of ``F^q`` and ``delta`` applies the component of 
+          the differential of ``self`` at the last point of every ``p``-chain. The blocks are 
+          written directly at their offsets in the total complex: the Godement blocks by 
+          :func:`_godement_differential_rows` with shifted offsets, and all terms share the 
+          chains of the chain index of the domain poset. 
+        """
+        index = chain_index(self._domain_poset)
+        dim = index.dimension()
+        source, ncols = self._total_offsets(n)
+        target, nrows = self._total_offsets(n + 1)
+        entries = dict()
+        for q, col in source.items():
+            p = n - q
+            sheaf = self.sheaf_at(q)
+            if p + 1 <= dim:
+                row = target[q]
+                for task in sheaf._godement_differential_tasks(p):
+                    chains, faces, row_offsets, col_offsets, restrictions = task[1:]
+                    shifted = (p, chains, faces, [offset + row for offset in row_offsets], [offset + col for offset in col_offsets], restrictions)
+                    entries.update(_godement_differential_rows(shifted))
+            if q + 1 in target:
+                row = target[q + 1]
+                sign = 1 if p % 2 == 0 else -1
+                components = self.differential(q)._component_matrices()
+                col_offsets = sheaf._chain_offsets(p)
+                row_offsets = self.sheaf_at(q + 1)._chain_offsets(p)
+                for k, x in enumerate(index.last_points(p)):
+                    for (a, b), value in components[x].dict().items():
+                        entries[(row + row_offsets[k] + a, col + col_offsets[k] + b)] = sign*value
+        return matrix(self._base_ring, nrows, ncols, entries, sparse=True)
+    
+    def total_godement_complex(self, degree=None):
+        """
+          Construct the total complex of the double complex of Godement resolutions of the 
+          terms of ``self``, whose term in degree ``n`` is the direct sum of the terms 
+          ``G^p(F^q)`` of the Godement cochain complexes of the terms ``F^q`` with ``p+q = n``. 
+          
+          If ``degree`` is given, only the differentials into and out of that degree are built. 
+        """
+        dim = chain_index(self._domain_poset).dimension()
+        if degree is None:
+            degrees = range(self.below_bound(), self.above_bound() + dim + 1)
+        else:
+            degrees = [n for n in (degree - 1, degree) if self.below_bound() <= n <= self.above_bound() + dim]
+        diff_dict = dict()
+        for n in degrees:
+            with profile_phase("total_differential", n):
+                diff_dict[n] = self._total_differential(n)
+        # the total differentials square to zero by construction
+        return ChainComplex(diff_dict, base_ring=self._base_ring, check=False)
+    
+    def hypercohomology(self, degree=None, reduced=False):
+        """
+          Return the hypercohomology of ``self``, the cohomology of its total Godement 
+          complex, see :meth:`total_godement_complex`. 
+          
+          INPUT:
+          
+          - ``degree`` -- (default: ``None``); if given, only the hypercohomology in this 
+              degree is returned, and only the two differentials around it are built. 
+          
+          - ``reduced`` -- (default: ``False``); if ``True``, the total complex is first 
+              reduced to its Morse complex, see :func:`morse_reduction`.
+        """
+        complex = self.total_godement_complex(degree)
+        degrees = complex.nonzero_degrees()
+        if reduced:
+            complex = morse_reduction(complex)[0]
+        if degree is not None:
+            with profile_phase("homology", degree):
+                return complex.homology(degree)
+        result = dict()
+        for n in degrees:
+            with profile_phase("homology", n):
+                result[n] = complex.homology(n)
+        return result
+    
     def __getitem__(self, place):
         return self.sheaf_at(place)
     
@@ -61,78 +174,96 @@ class LocFreeSheafComplex(CategoryObject):
         return "(Cochain) Complex of Locally Free Sheaves of Modules over {} on {} with at most {} nonzero terms".format(self._base_ring, self._domain_poset, len(self._sheaves))
         
 
-def _dualizing_sheaf(poset, degree, base_ring, rank):
-    p = degree*-1
-    chains = sorted(filter(lambda chain: len(chain)==p+1, poset.chains()))
-    singleton = Poset({0:[]}, {})
-    sheaf = LocallyFreeSheafFinitePoset({0:rank}, {}, base_ring = base_ring, domain_poset = singleton)
-    result = None
-    hom = Hom(singleton, poset)
-    for c in chains:
-        inclusion = hom(lambda point: {0:c[-1]}[point])
-        to_add = sheaf.pushforward(inclusion)
-        if result is None:
-            result = to_add
-        else:
-            result = result + to_add
-    return result
-    
+def _chain_members(index, p):
+    """
+      Return the list, indexed by point number, of the arrays of the positions of 
+      the ``p``-chains whose last point lies above the point, in increasing order.
+      These are the summands of the stalk of the dualizing sheaf in degree ``-p``.
+    """
+    by_last = [[] for x in range(index.cardinality())]
+    for k, last in enumerate(index.last_points(p)):
+        by_last[last].append(k)
+    members = []
+    for x in range(index.cardinality()):
+        positions = list(by_last[x])
+        for y in index.points_above(x):
+            positions.extend(by_last[y])
+        positions.sort()
+        members.append(array('i', positions))
+    return members
+
+def _dualizing_sheaf_from_members(poset, members, base_ring, rank):
+    """
+      Construct the dualizing sheaf with the summands ``members``, see :func:`_chain_members`,
+      as the direct sum of the pushforwards of the free module of rank ``rank`` to the last 
+      points of the chains. The restriction maps are sparse projections onto the summands 
+      that survive.
+    """
+    index = chain_index(poset)
+    ranks = [len(chains)*rank for chains in members]
+    blocks = []
+    for a, b in index.cover_relations():
+        positions = {k:col for col, k in enumerate(members[a])}
+        entries = dict()
+        for row, k in enumerate(members[b]):
+            col = positions[k]
+            for l in range(rank):
+                entries[(row*rank + l, col*rank + l)] = 1
+        blocks.append(matrix(base_ring, ranks[b], ranks[a], entries, sparse=True))
+    compact = CompactSheaf(index, base_ring, ranks, blocks)
+    return LocallyFreeSheafFinitePoset(compact.stalk_dict(), compact.res_dict(), base_ring, poset, compact)
+
+def _dualizing_differential(task):
+    """
+      Build the components of the differential of the dualizing complex that maps
+      the ``q``-chains to their faces, as a list of sparse matrices indexed by point 
+      numbers. ``task`` is the tuple ``(q, faces, start_members, end_members, rank, base_ring)``
+      of the face positions of the ``q``-chains and the summands of the dualizing sheaves
+      in degrees ``-q`` and ``-q+1``, see :func:`_chain_members`.
+    """
+    q, faces, start_members, end_members, rank, base_ring = task
+    components = []
+    for cols, rows in zip(start_members, end_members):
+        positions = {k:row for row, k in enumerate(rows)}
+        entries = dict()
+        for col, k in enumerate(cols):
+            for j in range(q + 1):
+                sign = 1 if j%2 == 0 else -1
+                # leaving out the last point gives a face that is only a summand of the stalks 
+                # at the points below its new last point
+                row = positions.get(faces[k*(q+1) + j])
+                if row is None:
+                    continue
+                for l in range(rank):
+                    entries[(row*rank + l, col*rank + l)] = sign
+        components.append(matrix(base_ring, len(rows)*rank, len(cols)*rank, entries, sparse=True))
+    return components
         
-def dualizing_complex(poset, base_ring=ZZ, rank=1):
-    dim = poset.height() - 1
+def dualizing_complex(poset, base_ring=ZZ, rank=1, workers=None):
+    """
+      Construct the dualizing complex of ``poset`` with coefficients in the free module 
+      of rank ``rank`` over ``base_ring``. If ``workers`` is given, the differentials are 
+      built on a pool of that many processes. 
+
+      By Verdier duality, the hypercohomology of the dualizing complex of rank ``1`` in 
+      degree ``-n`` is the homology in degree ``n`` of the order complex of ``poset``, see 
+      :meth:`LocFreeSheafComplex.hypercohomology`.
+    """
+    index = chain_index(poset)
+    dim = index.dimension()
     bound_below = -1*dim
     data = [bound_below]
-    end_base = sorted(filter(lambda c: len(c) == dim + 1, poset.maximal_chains()))
-    for p in range(-1*dim, 0):
-        start_base = end_base
-        end_base = sorted(filter(lambda c: len(c) == -1*p, poset.chains()))
-        #print("making differential from degree {}\n start: {}\n end:{}".format(p, start_base, end_base))
-        differential = dict()
-        for x in poset.list():
-            point_start_base = filter(lambda c: poset.is_lequal(x, c[-1]), start_base)
-            point_end_base = filter(lambda c: poset.is_lequal(x, c[-1]), end_base)
-            #print("------for point {}: \n---------start:{}\n---------end:{}".format(x, point_start_base, point_end_base))
-            rows = []
-            for end_chain in point_end_base:
-                blocks = []
-                for start_chain in point_start_base:
-                    if all(p in start_chain for p in end_chain):
-                        for y in start_chain:
-                            if y not in end_chain and y != start_chain[-1]:
-                                sign = 1 if start_chain.index(y)%2 == 0 else -1
-                                blocks.append(sign*identity_matrix(base_ring, rank))
-                                break
-                        else:
-                            blocks.append(matrix(base_ring, rank, rank))    
-                    else:
-                        blocks.append(matrix(base_ring, rank, rank))        
-                rows.append(blocks)
-            differential[x] = block_matrix(rows, subdivide = False)    
-        data.append(_dualizing_sheaf(poset, p, base_ring, rank))
-        data.append(differential)
-    data.append(_dualizing_sheaf(poset, 0, base_ring, rank))
+    members = [_chain_members(index, q) for q in range(dim + 1)]
+    # the differential from degree -q maps the q-chains to their faces
+    tasks = [(q, index.face_array(q), members[q], members[q - 1], rank, base_ring) for q in range(dim, 0, -1)]
+    differentials = pool_map(_dualizing_differential, tasks, workers)
+    for q, components in zip(range(dim, 0, -1), differentials):
+        data.append(_dualizing_sheaf_from_members(poset, members[q], base_ring, rank))
+        data.append({index.point(x):component for x, component in enumerate(components)})
+    data.append(_dualizing_sheaf_from_members(poset, members[0], base_ring, rank))
     if rank == 1:
         name = "dualizing complex of ({}, {})".format(poset, base_ring)
     else:
         name = "dualizing complex of ({}, rank-{} free module over {})".format(poset, rank, base_ring)    
-    return LocFreeSheafComplex(data, name=name)
-
-
-
-
-
-
-
-
-
-       
-        
-        
-        
-        
-        
-        
-        
-        
-        
-        
+    # the complex is a complex of sheaves by construction
+    return LocFreeSheafComplex(data, name=name, check=False)
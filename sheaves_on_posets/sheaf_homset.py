@@ -1,6 +1,6 @@
 from sage.structure.parent import Parent
 from sage.categories.sets_cat import Sets
-from sage.matrix.constructor import Matrix, matrix
+from sage.matrix.constructor import matrix
 from .sheaf_morphism import LocFreeSheafMorphism
 
 class LocFreeSheafHomset(Parent):
@@ -13,6 +13,7 @@ class LocFreeSheafHomset(Parent):
         self._codomain = sheaf2     
         self._base_ring = sheaf1._base_ring
         self._domain_poset = sheaf1._domain_poset
+        self._covers = None
          
     def domain(self):
         return self._domain
@@ -22,15 +23,81 @@ class LocFreeSheafHomset(Parent):
     
     def zero(self):
         zero = dict()
-        for i in self._domain_poset.list():
-            zero[i] = matrix(self._base_ring, self._domain._stalk_dict[i], self._codomain._stalk_dict[i])
+        for i, x in enumerate(self._domain._compact.index().points()):
+            zero[x] = matrix(self._base_ring, self._codomain._compact.rank(i), self._domain._compact.rank(i))
         return self(zero)
     
-    def __call__(self, component_dict, name = "sheaf morphism"):
+    def _cover_data(self):
+        """
+          Return the list of tuples ``(i, j, domain_block, codomain_block)`` of the cover 
+          relations ``(i, j)`` of the domain poset, in terms of point numbers, with the 
+          restriction matrices of the domain and codomain along them. The list is computed once. 
+        """
+        if self._covers is None:
+            domain = self._domain._compact
+            codomain = self._codomain._compact
+            self._covers = [(i, j, domain.cover_block(e), codomain.cover_block(e)) for e, (i, j) in enumerate(domain.index().cover_relations())]
+        return self._covers
+    
+    def _naturality_violation(self, matrices):
+        """
+          Return ``None`` if the component matrices ``matrices``, indexed by point number,
+          have the right shapes and commute with the cover restrictions, and otherwise the first 
+          point number or cover relation where this fails. 
+        """
+        domain = self._domain._compact
+        codomain = self._codomain._compact
+        for i, mat in enumerate(matrices):
+            if mat.dimensions() != (codomain.rank(i), domain.rank(i)):
+                return i
+        for i, j, domain_block, codomain_block in self._cover_data():
+            if codomain_block * matrices[i] != matrices[j] * domain_block:
+                return (i, j)
+        return None
+    
+    def __call__(self, component_dict, name = "sheaf morphism", check = True):
+        """
+          Construct the morphism of sheaves with the components ``component_dict``, a dictionary 
+          that maps every point to a matrix or to ``0`` or ``1``. If ``check`` is ``True``, 
+          it is checked that the components commute with the cover restrictions. 
+        """
         mor = self.element_class(self, component_dict, name)
-        for r in self._domain_poset.cover_relations():
-            if not self._codomain.restriction(r[0], r[1]).matrix() * mor.component_matrix(r[0]) == mor.component_matrix(r[1]) * self._domain.restriction(r[0], r[1]).matrix():
-                raise ValueError("input does not define a morphism of sheaves")
+        if check and self._naturality_violation(mor._component_matrices()) is not None:
+            raise ValueError("input does not define a morphism of sheaves")
+        return mor
+    
+    def morphisms(self, candidates, name = "sheaf morphism", skip_invalid = False):
+        """
+          Construct the morphisms of sheaves with the components given by the dictionaries 
+          in ``candidates``. 
+          
+          The restriction matrices of the domain and codomain are collected once and 
+          reused for all candidates. If ``skip_invalid`` is ``True``, candidates that do 
+          not define a morphism of sheaves are left out; otherwise a ``ValueError`` is raised 
+          for the first of them. 
+          
+          OUTPUT:
+          
+          The list of the morphisms, in the order of the candidates. 
+        """
+        result = []
+        for position, component_dict in enumerate(candidates):
+            mor = self.element_class(self, component_dict, name)
+            if self._naturality_violation(mor._component_matrices()) is not None:
+                if skip_invalid:
+                    continue
+                raise ValueError("candidate {} does not define a morphism of sheaves".format(position))
+            result.append(mor)
+        return result
+    
+    def _from_matrices(self, matrices, name = "sheaf morphism"):
+        """
+          Construct the morphism of sheaves with the immutable component matrices ``matrices``,
+          indexed by point number, without any checks. 
+        """
+        points = self._domain._compact.index().points()
+        mor = self.element_class(self, dict(zip(points, matrices)), name)
+        mor._matrices = matrices
         return mor
     
     def _repr_(self):
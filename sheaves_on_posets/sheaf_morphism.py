@@ -2,9 +2,11 @@
 from sage.structure.element import Element
 
 from sage.matrix.special import identity_matrix
-from sage.matrix.constructor import Matrix, matrix
+from sage.matrix.constructor import matrix
 from sage.categories.homset import Hom
 
+from .cache import LRUCache, MODULE_CACHE_SIZE
+
 class LocFreeSheafMorphism(Element):
     
     def __init__(self, parent, component_dict, name="sheaf morpism"):
@@ -14,6 +16,8 @@ class LocFreeSheafMorphism(Element):
         self._base_ring = self._parent._base_ring
         self._domain_poset = self._parent._domain_poset
         self._name = name
+        self._matrices = None
+        self._component_cache = LRUCache(MODULE_CACHE_SIZE)
         
     def domain(self):
         return self._parent.domain()
@@ -21,38 +25,65 @@ class LocFreeSheafMorphism(Element):
     def codomain(self):
         return self._parent.codomain()
     
+    def _component_matrices(self):
+        """
+          Return the list of the matrices of the components of ``self``, indexed by the 
+          point numbers of the chain index. The inputs ``0`` and ``1`` are replaced by 
+          zero and identity matrices. All internal computations use this list. 
+        """
+        if self._matrices is None:
+            domain = self.domain()._compact
+            codomain = self.codomain()._compact
+            matrices = []
+            for i, point in enumerate(domain.index().points()):
+                value = self._components[point]
+                if value == 0:
+                    mat = matrix(self._base_ring, codomain.rank(i), domain.rank(i))
+                elif value == 1:
+                    mat = identity_matrix(self._base_ring, domain.rank(i))
+                else:
+                    mat = matrix(self._base_ring, value)
+                mat.set_immutable()
+                matrices.append(mat)
+            self._matrices = matrices
+        return self._matrices
+    
     def component_matrix(self, point):
-        if self._components[point] == 0:
-            return matrix(self._base_ring, self.codomain()._stalk_dict[point], self.domain()._stalk_dict[point])
-        if self._components[point] == 1:
-            return identity_matrix(self._base_ring, self.domain()._stalk_dict[point])
-        return matrix(self._components[point])
+        return self._component_matrices()[self.domain()._compact.index().point_index(point)]
             
     def component(self, point):
+        """
+          Return the component of ``self`` at ``point`` as a morphism of stalks. The most 
+          recently used components are cached. 
+        """
+        return self._component_cache.get(point, lambda: self._component_morphism(point))
+    
+    def _component_morphism(self, point):
         h = Hom(self.domain().stalk(point), self.codomain().stalk(point))
-        if self._components[point] == 0:
-            phi = h.zero()
-        elif self._components[point] == 1:
-            phi = h(identity_marix(self._base_ring, self.domain()._stalk_dict[point]))
-        else:
-            phi = h(self._components[point])    
+        phi = h(self.component_matrix(point))
         phi._name = "Component of {} at {}".format(self._name, point)
         return phi
         
     def is_injective(self):
-        return all(self.component_matrix(i).right_kernel().rank() == 0 for i in self._domain_poset.list())
+        return all(mat.right_kernel().rank() == 0 for mat in self._component_matrices())
     
     def is_zero(self):
-        return all(self.component_matrix(x).is_zero() for x in self._domain_poset.list())
+        return all(mat.is_zero() for mat in self._component_matrices())
     
     def compose(self, other):
+        """
+          Return the composition of ``self`` followed by ``other``. The composition of two 
+          morphisms of sheaves is natural, so it is not checked again. 
+        """
         if not other.domain() == self.codomain():
             raise ValueError("codomain and domain of maps to compose do not match")
-        result_map = dict()
-        for x in self._domain_poset.list():
-            result_map[x] = other.component_matrix(x) * self.component_matrix(x)
+        matrices = []
+        for mat, other_mat in zip(self._component_matrices(), other._component_matrices()):
+            product = other_mat * mat
+            product.set_immutable()
+            matrices.append(product)
         hom = Hom(self.domain(), other.codomain())
-        return hom(result_map)
+        return hom._from_matrices(matrices)
         
     def __getitem__(self, i):
         return self.component(i)
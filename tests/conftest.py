@@ -0,0 +1,56 @@
+"""
+  Shared Helpers of the Tests.
+"""
+
+# imports
+import itertools
+
+import pytest
+
+try:
+    import sage.all
+except ImportError:
+    # modular distributions of Sage
+    import sage.all__sagemath_combinat
+
+from sage.combinat.posets.posets import Poset
+
+#-------------------------------------------------------------------------------
+def _face_poset(facets, top=False):
+    """
+      Return the face poset of the simplicial complex with the facets ``facets``, whose
+      points are the nonempty faces as sorted tuples of vertices, with an extra point
+      ``"top"`` above all facets if ``top`` is ``True``.
+    """
+    facets = [tuple(sorted(facet)) for facet in facets]
+    faces = set()
+    for facet in facets:
+        for k in range(1, len(facet) + 1):
+            faces.update(itertools.combinations(facet, k))
+    faces = sorted(faces)
+    covers = [(face, coface) for coface in faces if len(coface) > 1 for face in itertools.combinations(coface, len(coface) - 1)]
+    if top:
+        covers.extend((facet, "top") for facet in facets)
+        faces.append("top")
+    return Poset((faces, covers), cover_relations=True)
+
+@pytest.fixture
+def face_poset():
+    """
+      The function that builds face posets of simplicial complexes, see :func:`_face_poset`.
+    """
+    return _face_poset
+
+@pytest.fixture
+def torus_facets():
+    """
+      The facets of the triangulation of the torus with 9 vertices, obtained from the
+      3 by 3 grid with opposite sides identified.
+    """
+    vertex = lambda i, j: (i % 3)*3 + (j % 3)
+    facets = []
+    for i in range(3):
+        for j in range(3):
+            facets.append((vertex(i, j), vertex(i + 1, j), vertex(i + 1, j + 1)))
+            facets.append((vertex(i, j), vertex(i, j + 1), vertex(i + 1, j + 1)))
+    return facets
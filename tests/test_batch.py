@@ -0,0 +1,19 @@
+"""
+  Tests of the Cohomology of Batches of Sheaves.
+"""
+
+# imports
+import time
+
+from sage.combinat.posets.posets import Poset
+
+from sheaves_on_posets import ConstantSheaf, cohomology_batch, profiling
+
+#-------------------------------------------------------------------------------
+def test_homology_phase_excludes_the_consumer():
+    poset = Poset({0:[2, 3], 1:[2, 3]})
+    for degree in (None, 1):
+        with profiling() as report:
+            for result in cohomology_batch([ConstantSheaf(poset)]*2, degree):
+                time.sleep(0.2)
+        assert report.total_time("homology") < 0.2
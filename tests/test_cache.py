@@ -0,0 +1,40 @@
+"""
+  Tests of the Persistent Cache.
+"""
+
+# imports
+import os
+
+import numpy
+
+from sage.combinat.posets.posets import Poset
+
+from sheaves_on_posets import ConstantSheaf, PersistentCache, set_persistent_cache
+
+#-------------------------------------------------------------------------------
+def test_size_is_tracked_without_rescanning(tmp_path):
+    cache = PersistentCache(str(tmp_path), max_bytes=10000)
+    for k in range(20):
+        cache.put("key", "entry_{}".format(k), {"k":k}, {"values":numpy.zeros(100, dtype=numpy.int64)})
+    assert cache.size() == sum(size for last_use, size, path in cache._entries())
+    assert cache.size() <= 10000
+    assert cache.stats()["evictions"] > 0
+    # the most recent entry survives
+    assert cache.get("key", "entry_19")[0] == {"k":19}
+    cache.clear()
+    assert cache.size() == 0
+
+def test_cohomology_entries_depend_on_the_options(tmp_path):
+    cache = set_persistent_cache(str(tmp_path))
+    try:
+        F = ConstantSheaf(Poset({0:[2, 3], 1:[2, 3]}))
+        unreduced = F.cohomology()
+        reduced = F.cohomology(reduced=True)
+        names = sorted(os.path.basename(path) for last_use, size, path in cache._entries())
+        assert [name for name in names if name.startswith("cohomology")] == ["cohomology_godement", "cohomology_godement_reduced"]
+        hits = cache.stats()["hits"]
+        assert F.cohomology() == unreduced
+        assert F.cohomology(reduced=True) == reduced == unreduced
+        assert cache.stats()["hits"] == hits + 2
+    finally:
+        set_persistent_cache(None)
@@ -0,0 +1,33 @@
+"""
+  Tests of the Cellular Cochain Complexes.
+"""
+
+# imports
+import itertools
+
+import pytest
+
+from sheaves_on_posets import ConstantSheaf, incidence_signs
+
+#-------------------------------------------------------------------------------
+def test_cellular_matches_godement_on_torus(face_poset, torus_facets):
+    F = ConstantSheaf(face_poset(torus_facets))
+    assert F.cohomology(method="cellular") == F.cohomology()
+
+def test_ball_is_a_regular_cw_complex(face_poset):
+    # the boundary of a tetrahedron with one 3-cell attached is a ball
+    poset = face_poset(itertools.combinations(range(4), 3), top=True)
+    incidence_signs(poset, check=True)
+    F = ConstantSheaf(poset)
+    assert F.cohomology(method="cellular") == F.cohomology()
+
+def test_cell_with_torus_boundary_is_rejected(face_poset, torus_facets):
+    poset = face_poset(torus_facets, top=True)
+    with pytest.raises(ValueError, match="sphere"):
+        incidence_signs(poset, check=True)
+    F = ConstantSheaf(poset)
+    with pytest.raises(ValueError, match="sphere"):
+        F.cellular_cochain_complex(check=True)
+    signs = incidence_signs(poset)
+    with pytest.raises(ValueError, match="sphere"):
+        F.cellular_cochain_complex(signs, check=True)
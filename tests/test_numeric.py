@@ -0,0 +1,36 @@
+"""
+  Tests of the Floating-Point Cohomology of Sheaves.
+"""
+
+# imports
+import numpy
+import pytest
+
+from sage.combinat.posets.posets import Poset
+from sage.rings.rational_field import QQ
+from sage.rings.real_double import RDF
+
+from sheaves_on_posets import ConstantSheaf, numeric_rank
+
+scipy_sparse = pytest.importorskip("scipy.sparse")
+
+#-------------------------------------------------------------------------------
+def test_numeric_rank():
+    rng = numpy.random.RandomState(0)
+    mat = scipy_sparse.random(60, 40, density=0.2, random_state=rng) @ scipy_sparse.random(40, 50, density=0.2, random_state=rng)
+    assert numeric_rank(scipy_sparse.csr_matrix(mat)) == numpy.linalg.matrix_rank(mat.toarray())
+    assert numeric_rank(scipy_sparse.csr_matrix((3, 4))) == 0
+
+@pytest.mark.parametrize("dense_limit", [1500, 10])
+def test_numeric_cohomology_of_torus(monkeypatch, dense_limit, face_poset, torus_facets):
+    monkeypatch.setattr("sheaves_on_posets.numeric.DENSE_LIMIT", dense_limit)
+    poset = face_poset(torus_facets)
+    exact = ConstantSheaf(poset, QQ).betti_numbers()
+    assert ConstantSheaf(poset, RDF).cohomology(backend="numpy") == exact
+    assert exact[1] == 2
+
+def test_numpy_backend_rejects_unsupported_options():
+    F = ConstantSheaf(Poset({0:[2, 3], 1:[2, 3]}), RDF)
+    for options in ({"reduced":True}, {"primes":(2,)}, {"workers":2}):
+        with pytest.raises(ValueError):
+            F.cohomology(backend="numpy", **options)
@@ -0,0 +1,20 @@
+"""
+  Tests of the Ranks of Sparse Matrices.
+"""
+
+# imports
+from sage.matrix.constructor import matrix
+from sage.rings.integer_ring import ZZ
+
+from sheaves_on_posets import LocFreeSheaf
+from sheaves_on_posets.ranks import matrix_rank
+
+#-------------------------------------------------------------------------------
+def test_torsion_at_every_prime():
+    assert matrix_rank(matrix(ZZ, [[2]]), primes=(2,)) == 1
+    assert matrix_rank(matrix(ZZ, [[2, 0], [0, 0]]), primes=(2,)) == 1
+    assert matrix_rank(matrix(ZZ, [[6*32003*32749, 0], [0, 0]])) == 1
+
+def test_betti_numbers_with_torsion_at_every_default_prime():
+    F = LocFreeSheaf({'a':1, 'b':1, 'e':1}, {('a', 'e'):matrix(ZZ, [[6*32003*32749]]), ('b', 'e'):0})
+    assert F.betti_numbers() == {0:1, 1:0}
@@ -0,0 +1,35 @@
+"""
+  Tests of the Complexes of Sheaves.
+"""
+
+# imports
+import itertools
+
+from sage.combinat.posets.posets import Poset
+from sage.combinat.posets.poset_examples import posets
+
+from sheaves_on_posets import dualizing_complex
+
+#-------------------------------------------------------------------------------
+def check_verdier_duality(poset):
+    hypercohomology = dualizing_complex(poset).hypercohomology()
+    homology = poset.order_complex().homology(reduced=False)
+    for n, group in hypercohomology.items():
+        if -n in homology:
+            assert group == homology[-n]
+        else:
+            assert group.invariants() == ()
+
+def test_dualizing_complex_of_circle():
+    check_verdier_duality(Poset({0:[2, 3], 1:[2, 3]}))
+
+def test_dualizing_complex_of_sphere(face_poset):
+    check_verdier_duality(face_poset(itertools.combinations(range(4), 3)))
+
+def test_total_godement_complex_squares_to_zero(face_poset):
+    for poset, rank in [(posets.BooleanLattice(3), 1), (face_poset(itertools.combinations(range(4), 3)), 2)]:
+        total = dualizing_complex(poset, rank=rank).total_godement_complex()
+        differentials = total.differential()
+        for n, differential in differentials.items():
+            if n + 1 in differentials:
+                assert (differentials[n + 1]*differential).is_zero()